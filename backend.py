@@ -0,0 +1,153 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# 'pandas' runs the joins and grouped aggregations of the page pipelines with pandas;
+# 'arrow' runs them on Arrow tables with pyarrow.compute, which uses every core.
+# benchmarks/backend_parity.py checks that both give the same tables.
+BACKEND = os.environ.get('TUITION_BACKEND', 'pandas')
+BACKENDS = ('pandas', 'arrow')
+if BACKEND not in BACKENDS:
+    raise ValueError(f'TUITION_BACKEND must be one of {BACKENDS}, not {BACKEND!r}')
+
+_local = threading.local()
+
+
+def current_backend():
+    return getattr(_local, 'backend', None) or BACKEND
+
+
+@contextmanager
+def use_backend(name: str):
+    # Overrides the configured backend for the calling thread only.
+    if name not in BACKENDS:
+        raise ValueError(f'backend must be one of {BACKENDS}, not {name!r}')
+    previous = getattr(_local, 'backend', None)
+    _local.backend = name
+    try:
+        yield
+    finally:
+        _local.backend = previous
+
+
+def merge(left: pd.DataFrame, right: pd.DataFrame, on: str, how: str = 'inner'):
+    # Same rows, row order and columns as pd.merge. The Arrow path joins only the key
+    # column and row positions; the frames' other columns are gathered by position.
+    overlap = (set(left.columns) & set(right.columns)) - {on}
+    if current_backend() == 'pandas' or how != 'inner' or overlap or isinstance(left[on].dtype, pd.CategoricalDtype):
+        return pd.merge(left, right, how=how, on=on)
+
+    left_keys = pa.table({on: pa.array(left[on], from_pandas=True), '__left': np.arange(len(left))})
+    right_keys = pa.table({on: pa.array(right[on], from_pandas=True), '__right': np.arange(len(right))})
+    joined = left_keys.join(right_keys, keys=on, join_type='inner', use_threads=True)
+    # pd.merge keeps the left order, and the right order among rows sharing a key.
+    joined = joined.sort_by([('__left', 'ascending'), ('__right', 'ascending')])
+
+    left_rows = left.take(joined['__left'].to_numpy()).reset_index(drop=True)
+    right_rows = right.drop(columns=[on]).take(joined['__right'].to_numpy()).reset_index(drop=True)
+    return pd.concat([left_rows, right_rows], axis=1)
+
+
+def qcut(values: pd.Series, q: int):
+    # Same categories and edges as pd.qcut(values, q, retbins=True).
+    if current_backend() == 'pandas':
+        return pd.qcut(values, q=q, retbins=True)
+
+    quantiles = pc.quantile(pa.array(values, from_pandas=True), q=np.linspace(0, 1, q + 1), interpolation='linear')
+    return pd.cut(values, quantiles.to_numpy(), include_lowest=True, retbins=True)
+
+
+def group_agg(df: pd.DataFrame, keys: list, aggs: dict, sort: bool = True, dropna: bool = True):
+    # df.groupby(keys, observed=True, sort=sort, dropna=dropna).agg(**aggs).reset_index(),
+    # with aggs mapping output columns to (column, function) pairs.
+    if current_backend() == 'pandas':
+        return df.groupby(keys, observed=True, sort=sort, dropna=dropna).agg(**aggs).reset_index()
+    return _arrow_group_agg(df, keys, aggs, sort, dropna)
+
+
+# pandas skips missing values and sums an empty group to 0.
+_arrow_aggs = {
+    'sum': ('sum', pc.ScalarAggregateOptions(min_count=0)),
+    'mean': ('mean', None),
+    'min': ('min', None),
+    'max': ('max', None),
+    'count': ('count', pc.CountOptions(mode='only_valid')),
+    'size': ('count', pc.CountOptions(mode='all'))
+}
+
+
+def _key_array(values: pd.Series):
+    # Categorical keys are grouped by their codes: code order is category order,
+    # which is also the order pandas sorts them in.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        return pa.array(codes, mask=codes < 0)
+    return pa.array(values, from_pandas=True)
+
+
+def _arrow_group_agg(df: pd.DataFrame, keys: list, aggs: dict, sort: bool, dropna: bool):
+    # One input column per aggregation (the arrays are shared, not copied), so two
+    # aggregations of the same column cannot clash in the output names.
+    columns = {key: _key_array(df[key]) for key in keys}
+    values = {column: pa.array(df[column], from_pandas=True) for column, _ in aggs.values()}
+    for i, (column, _) in enumerate(aggs.values()):
+        columns[f'__agg{i}'] = values[column]
+    columns['__row'] = np.arange(len(df))
+    table = pa.table(columns)
+
+    if dropna:
+        for key in keys:
+            table = table.filter(pc.is_valid(table[key]))
+
+    hash_aggs = [(f'__agg{i}', *_arrow_aggs[func]) for i, (_, func) in enumerate(aggs.values()) if func != 'median']
+    grouped = table.group_by(keys, use_threads=True).aggregate(hash_aggs + [('__row', 'min')])
+
+    outputs = {}
+    for i, (name, (_, func)) in enumerate(aggs.items()):
+        if func == 'median':
+            medians = _arrow_group_median(table, keys, f'__agg{i}')
+            grouped = grouped.join(medians, keys=keys, join_type='left outer', use_threads=True)
+            outputs[name] = f'__agg{i}'
+        else:
+            outputs[name] = f'__agg{i}_{_arrow_aggs[func][0]}'
+
+    # Hash aggregation returns groups in no particular order.
+    order = [(key, 'ascending') for key in keys] if sort else [('__row_min', 'ascending')]
+    grouped = grouped.sort_by(order)
+
+    result = {}
+    for key in keys:
+        result[key] = grouped[key].to_pandas()
+        if isinstance(df[key].dtype, pd.CategoricalDtype):
+            result[key] = pd.Categorical.from_codes(result[key].fillna(-1).astype('int64'), dtype=df[key].dtype)
+    for name, column in outputs.items():
+        result[name] = grouped[column].to_pandas()
+
+    return pd.DataFrame(result)
+
+
+def _arrow_group_median(table: pa.Table, keys: list, column: str):
+    # Arrow only has an approximate grouped median, so the exact one is read off the
+    # table sorted by group and value: the middle one or two values of each run.
+    table = table.filter(pc.is_valid(table[column]))
+    table = table.sort_by([(key, 'ascending') for key in keys] + [(column, 'ascending')])
+
+    size = len(table)
+    key_values = [table[key].to_numpy(zero_copy_only=False) for key in keys]
+    starts = np.zeros(size, dtype=bool)
+    starts[:1] = True
+    for values in key_values:
+        starts[1:] |= values[1:] != values[:-1]
+    starts = np.flatnonzero(starts)
+    ends = np.append(starts[1:], size)
+
+    values = table[column].to_numpy(zero_copy_only=False).astype('float64')
+    medians = (values[starts + (ends - starts - 1) // 2] + values[starts + (ends - starts) // 2]) / 2
+
+    return pa.table({**{key: table[key].take(pa.array(starts)) for key in keys}, column: medians})
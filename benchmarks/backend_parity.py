@@ -0,0 +1,98 @@
+import argparse
+import itertools
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fixtures import write_fixtures
+from benchmarks.run_benchmarks import configure_data
+
+
+def pipelines():
+    # Every table a page builds with the backend, for its whole widget matrix.
+    import diversity
+    import income_levels
+    import tuition_salary
+    import us_map
+    from data_loader import load_manifest
+    from schools import get_fact_table, get_school_dim
+
+    school_dim = get_school_dim()
+    tuition_cost = get_fact_table('tuition_cost')
+    salary_potential = get_fact_table('salary_potential')
+    diversity_school = get_fact_table('diversity_school')
+
+    yield 'tuition_salary.get_df1', lambda: tuition_salary.get_df1(school_dim, tuition_cost, salary_potential, diversity_school)
+
+    for year in load_manifest('tuition_income')['partitions']:
+        year = int(year)
+        yield f'income_levels.get_df2({year})', lambda: income_levels.get_df2(year)
+        for split_col in income_levels.split_cols:
+            yield f'income_levels.build_median_tables({year})[{split_col}]', \
+                lambda: income_levels.build_median_tables(income_levels.get_df2(year))[split_col]
+
+    for div_type, x_type in itertools.product(diversity.DIV_OPTIONS, diversity.X_COLUMNS.values()):
+        yield f'diversity.build_dfs({div_type}, {x_type})', lambda: diversity.build_dfs(school_dim, diversity_school, div_type, x_type)
+
+    yield 'us_map.build_state_cube', lambda: us_map.build_state_cube(school_dim, tuition_cost, salary_potential, diversity_school)
+    for type_list, length_list, data_choice in us_map.widget_combinations():
+        yield f'us_map.get_df({type_list}, {length_list}, {data_choice})', lambda: us_map.get_df(type_list, length_list, data_choice)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the Arrow backend builds the same tables as the pandas one.')
+    parser.add_argument('--data-dir', help='Folder with local copies of the TidyTuesday CSVs; synthetic fixtures are generated when omitted')
+    parser.add_argument('--scale', type=float, default=1.0, help='Row-count multiplier for generated fixtures')
+    parser.add_argument('--rtol', type=float, default=1e-9, help='Relative tolerance for floating point columns')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.data_dir:
+            data_dir = Path(args.data_dir)
+        else:
+            data_dir = write_fixtures(Path(tmp_dir) / 'data', scale=args.scale)
+        configure_data(data_dir, Path(tmp_dir) / 'cache')
+
+        import streamlit.logger
+        streamlit.logger.set_log_level('error')
+
+        from backend import use_backend
+
+        failures = 0
+        times = {'pandas': 0.0, 'arrow': 0.0}
+        for name, func in pipelines():
+            with use_backend('pandas'):
+                expected, elapsed = timed(func)
+                times['pandas'] += elapsed
+            with use_backend('arrow'):
+                result, elapsed = timed(func)
+                times['arrow'] += elapsed
+
+            try:
+                pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=args.rtol)
+            except AssertionError as e:
+                failures += 1
+                print(f'MISMATCH {name}\n{e}\n')
+
+    print(f"pandas {times['pandas'] * 1000:.0f} ms, arrow {times['arrow'] * 1000:.0f} ms")
+    if failures:
+        print(f'{failures} tables differ')
+        sys.exit(1)
+    print('all tables match')
+
+
+if __name__ == '__main__':
+    main()
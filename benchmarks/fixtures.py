@@ -0,0 +1,148 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Synthetic stand-ins for the TidyTuesday 2020-03-10 CSVs with the same columns,
+# value domains and, at scale=1, roughly the same row counts as the real files.
+STATES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California', 'CO': 'Colorado',
+    'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia', 'HI': 'Hawaii', 'ID': 'Idaho',
+    'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa', 'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana',
+    'ME': 'Maine', 'MD': 'Maryland', 'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi',
+    'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma',
+    'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina', 'SD': 'South Dakota',
+    'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington',
+    'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+    # The real tuition_cost leaves state empty for DC and the territories.
+    'DC': None, 'PR': None, 'GU': None, 'VI': None, 'AS': None
+}
+CATEGORIES = ['Women', 'American Indian / Alaska Native', 'Asian', 'Black', 'Hispanic', 'Native Hawaiian / Pacific Islander',
+              'White', 'Two Or More Races', 'Unknown', 'Non-Resident Foreign', 'Total Minority']
+INCOME_LEVELS = ['0 to 30,000', '30,001 to 48,000', '48_001 to 75,000', '75,001 to 110,000', 'Over 110,000']
+
+
+def make_tuition_cost(rng: np.random.Generator, n_schools: int):
+    codes = rng.choice(list(STATES), n_schools)
+    names = [f'College {i}' for i in range(n_schools)]
+    # A handful of repeated names, as in the real file.
+    for i in range(0, n_schools, 500):
+        names[i] = names[i + 1]
+
+    in_state = rng.integers(2_000, 55_000, n_schools)
+    out_of_state = np.maximum(in_state, rng.integers(2_000, 60_000, n_schools))
+    room_and_board = rng.integers(3_000, 17_000, n_schools).astype(float)
+    room_and_board[rng.random(n_schools) < 0.4] = np.nan
+
+    return pd.DataFrame({
+        'name': names,
+        'state': [STATES[code] for code in codes],
+        'state_code': codes,
+        'type': rng.choice(['Public', 'Private', 'For Profit', 'Other'], n_schools, p=[0.43, 0.46, 0.1, 0.01]),
+        'degree_length': rng.choice(['4 Year', '2 Year', 'Other'], n_schools, p=[0.63, 0.36, 0.01]),
+        'room_and_board': room_and_board,
+        'in_state_tuition': in_state,
+        'in_state_total': in_state + np.nan_to_num(room_and_board).astype(int),
+        'out_of_state_tuition': out_of_state,
+        'out_of_state_total': out_of_state + np.nan_to_num(room_and_board).astype(int)
+    })
+
+
+def make_salary_potential(rng: np.random.Generator, tuition_cost: pd.DataFrame, n_schools: int):
+    names = rng.choice(tuition_cost['name'].unique(), n_schools, replace=False)
+    early = rng.integers(32_000, 90_000, n_schools)
+
+    return pd.DataFrame({
+        'rank': np.arange(1, n_schools + 1),
+        'name': names,
+        'state_name': 'Unknown',
+        'early_career_pay': early,
+        'mid_career_pay': early + rng.integers(15_000, 70_000, n_schools),
+        'make_world_better_percent': rng.integers(30, 80, n_schools).astype(float),
+        'stem_percent': rng.integers(0, 80, n_schools)
+    })
+
+
+def make_diversity_school(rng: np.random.Generator, tuition_cost: pd.DataFrame, n_schools: int):
+    matched = rng.choice(tuition_cost['name'].unique(), min(n_schools, tuition_cost['name'].nunique()), replace=False)
+    names = np.concatenate([matched, [f'Unlisted College {i}' for i in range(n_schools - len(matched))]])
+    states = tuition_cost.drop_duplicates('name').set_index('name')['state'].reindex(names).fillna('Unknown').to_numpy()
+    total = rng.integers(100, 60_000, len(names))
+
+    shares = rng.dirichlet(np.ones(len(CATEGORIES)), len(names))
+    enrollment = (shares * total[:, None]).astype(int)
+    # Women and Total Minority are aggregates rather than a share of a partition.
+    enrollment[:, 0] = (total * rng.uniform(0.3, 0.7, len(names))).astype(int)
+    enrollment[:, -1] = (total * rng.uniform(0.05, 0.9, len(names))).astype(int)
+
+    return pd.DataFrame({
+        'name': np.repeat(names, len(CATEGORIES)),
+        'total_enrollment': np.repeat(total, len(CATEGORIES)),
+        'state': np.repeat(states, len(CATEGORIES)),
+        'category': np.tile(CATEGORIES, len(names)),
+        'enrollment': enrollment.ravel()
+    })
+
+
+def make_tuition_income(rng: np.random.Generator, tuition_cost: pd.DataFrame, n_rows: int):
+    years = np.arange(2010, 2019)
+    campuses = ['On Campus', 'Off Campus']
+    groups = n_rows // len(INCOME_LEVELS)
+
+    names = rng.choice(tuition_cost['name'].unique(), groups)
+    states = tuition_cost.drop_duplicates('name').set_index('name')['state'].reindex(names).to_numpy()
+    total_price = rng.integers(5_000, 75_000, groups).astype(float)
+    total_price[rng.random(groups) < 0.002] = 0
+
+    net_share = rng.uniform(0.05, 1.1, (groups, len(INCOME_LEVELS))).cumsum(axis=1) / len(INCOME_LEVELS)
+
+    return pd.DataFrame({
+        'name': np.repeat(names, len(INCOME_LEVELS)),
+        'state': np.repeat(states, len(INCOME_LEVELS)),
+        'total_price': np.repeat(total_price, len(INCOME_LEVELS)),
+        'year': np.repeat(rng.choice(years, groups), len(INCOME_LEVELS)),
+        'campus': np.repeat(rng.choice(campuses, groups), len(INCOME_LEVELS)),
+        'net_cost': (net_share * total_price[:, None]).ravel().round(2),
+        'income_lvl': np.tile(INCOME_LEVELS, groups)
+    })
+
+
+def make_historical_tuition():
+    types = ['All Institutions', 'Public', 'Private']
+    years = [f'{year}-{str(year + 1)[-2:]}' for year in range(1985, 2017)]
+    rows = [(t, y, tuition_type, 10_000.0 + 250 * i)
+            for t in types for i, y in enumerate(years) for tuition_type in ['All Constant', 'All Current']]
+    return pd.DataFrame(rows, columns=['type', 'year', 'tuition_type', 'tuition_cost'])
+
+
+def write_fixtures(out_dir, scale: float = 1.0, seed: int = 0):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    tuition_cost = make_tuition_cost(rng, max(int(2973 * scale), 600))
+    datasets = {
+        'tuition_cost': tuition_cost,
+        'salary_potential': make_salary_potential(rng, tuition_cost, max(int(935 * scale), 100)),
+        'diversity_school': make_diversity_school(rng, tuition_cost, max(int(4575 * scale), 100)),
+        'tuition_income': make_tuition_income(rng, tuition_cost, max(int(209012 * scale), 1000)),
+        'historical_tuition': make_historical_tuition()
+    }
+
+    for data_type, data in datasets.items():
+        data.to_csv(out_dir / f'{data_type}.csv', index=False)
+
+    return out_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic TidyTuesday tuition CSVs for offline runs.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier on the real row counts')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_fixtures(args.out_dir, args.scale, args.seed)
@@ -0,0 +1,106 @@
+import argparse
+import json
+import platform
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that are imported on their own: the pages (by the server, the warm-up and the
+# offline tools) and the warm-up the app starts.
+MODULES = ['tuition_salary', 'tuition_income_level', 'diversity', 'us_map', 'warmup']
+# Only loaded once something is drawn or a chart is built, never by an import.
+LAZY_MODULES = ['streamlit', 'plotly.express', 'plotly.graph_objects']
+# Imported before the module under test, so the budget covers what the repo's own code
+# adds on top of them instead of mostly measuring pandas.
+BASELINE_MODULES = ['pandas', 'pyarrow']
+
+_IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def import_times(module: str, baseline: list):
+    # A fresh interpreter per measurement, so only the baseline is in sys.modules yet.
+    code = (f'import sys, {", ".join(baseline + [module])}; '
+            f'print(" ".join(name for name in {LAZY_MODULES!r} if name in sys.modules))')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    # Each import is reported after everything it imported, indented one level deeper,
+    # so the module's direct imports are the depth-1 lines just before its own line.
+    # Whatever the baseline already imported is not reported again under the module.
+    own_ms = None
+    baseline_ms = 0
+    imports = {}
+    children = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        _, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        if depth == 1:
+            children[name] = int(cumulative_us) / 1000
+        elif depth == 0:
+            if name == module:
+                own_ms, imports = int(cumulative_us) / 1000, children
+            elif name in baseline:
+                baseline_ms += int(cumulative_us) / 1000
+            children = {}
+
+    return own_ms, baseline_ms, imports, result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the import time of each entry module on top of pandas and pyarrow and check it against a budget.')
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--budget-ms', type=float, default=200,
+                        help='Largest import time allowed per module, on top of the baseline modules')
+    parser.add_argument('--baseline', nargs='*', default=BASELINE_MODULES,
+                        help='Modules imported first and left out of the budget; pass none to budget the full import')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per module; the fastest run is reported')
+    parser.add_argument('--top', type=int, default=8, help='Direct imports listed per module')
+    parser.add_argument('--output', default='import_times.json')
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    for module in args.modules:
+        runs = [import_times(module, args.baseline) for _ in range(args.repeat)]
+        total, baseline_ms, imports, eager = min(runs, key=lambda run: run[0])
+
+        # What the module itself imports, heaviest first, each with everything under it.
+        imports = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+        results[module] = {'own_ms': total, 'baseline_ms': baseline_ms, 'imports': dict(imports), 'eager': eager}
+
+        print(f'{module:24} {total:8.1f} ms  (+{baseline_ms:.1f} ms baseline)')
+        for name, cumulative_ms in imports[:args.top]:
+            print(f'    {name:36} {cumulative_ms:8.1f} ms')
+
+        if total > args.budget_ms:
+            failures.append(f'{module} takes {total:.0f} ms to import on top of the baseline, over the {args.budget_ms:.0f} ms budget')
+        if eager:
+            failures.append(f'importing {module} loads {", ".join(eager)}, which should only load on first use')
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'budget_ms': args.budget_ms,
+                'baseline': args.baseline,
+                'repeat': args.repeat
+            },
+            'modules': results
+        }, f, indent=2)
+
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+    print(f'all modules within {args.budget_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fixtures import write_fixtures
+from benchmarks.run_benchmarks import configure_data, git_revision
+
+
+PAGES = ['tuition_salary.py', 'tuition_income_level.py', 'diversity.py', 'us_map.py']
+APP = 'streamlit_app.py'
+
+
+def current_rss():
+    # Resident set size right now (Linux); other platforms fall back to the peak.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def share_test_runtime():
+    # AppTest installs a mock Runtime singleton for the length of each run and unsets
+    # it afterwards, which breaks runs still in progress on other threads. Fall back
+    # to one shared mock whenever the singleton is unset, so sessions can overlap.
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    fallback = MagicMock(spec=Runtime)
+    fallback.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    fallback.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or fallback)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def interact(at, rng: random.Random, pages: list):
+    # One random user action: change a sidebar widget or, in the multipage app,
+    # occasionally switch to another page.
+    if pages and rng.random() < 0.2:
+        at.switch_page(rng.choice(pages))
+        return
+
+    widgets = list(at.sidebar.selectbox) + list(at.sidebar.slider) + list(at.sidebar.multiselect)
+    if not widgets:
+        return
+
+    widget = rng.choice(widgets)
+    if widget.type == 'selectbox':
+        widget.select(rng.choice(widget.options))
+    elif widget.type == 'multiselect':
+        widget.set_value(rng.sample(widget.options, rng.randint(1, len(widget.options))))
+    else:
+        widget.set_value(rng.randint(int(widget.min), int(widget.max)))
+
+
+def run_session(script: str, reruns: int, seed: int, timeout: float, start: threading.Barrier):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    pages = PAGES if script == APP else []
+    at = AppTest.from_file(str(REPO_ROOT / script), default_timeout=timeout)
+
+    latencies = []
+    errors = []
+    start.wait()
+    for i in range(reruns + 1):
+        if i:
+            interact(at, rng, pages)
+        began = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - began)
+        errors.extend(str(e.value) for e in at.exception)
+
+    return latencies, errors
+
+
+def run_level(script: str, sessions: int, reruns: int, seed: int, timeout: float):
+    start = threading.Barrier(sessions)
+    rss_before = current_rss()
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, script, reruns, seed * 1000 + i, timeout, start) for i in range(sessions)]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - began
+    rss_after = current_rss()
+
+    latencies = np.array([latency for session, _ in results for latency in session]) * 1000
+    errors = [error for _, session in results for error in session]
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'wall_s': wall,
+        'throughput_rps': len(latencies) / wall,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'rss_bytes': rss_after,
+        'rss_growth_bytes': rss_after - rss_before,
+        'rss_growth_per_session_bytes': (rss_after - rss_before) / sessions,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None
+    }
+
+
+def capacity(levels: list, slo_ms: float):
+    # Most concurrent sessions whose p95 rerun latency stayed within the target.
+    within = [level['sessions'] for level in levels if level['p95_ms'] <= slo_ms and not level['errors']]
+    return max(within) if within else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the app and each page from many simulated sessions at once with AppTest.')
+    parser.add_argument('--data-dir', help='Folder with local copies of the TidyTuesday CSVs; synthetic fixtures are generated when omitted')
+    parser.add_argument('--scale', type=float, default=1.0, help='Row-count multiplier for generated fixtures')
+    parser.add_argument('--sessions', default='1,2,4,8,16', help='Comma-separated concurrent session counts to step through')
+    parser.add_argument('--reruns', type=int, default=20, help='Random widget interactions per session after its first run')
+    parser.add_argument('--scripts', nargs='+', default=[APP] + PAGES, help='Scripts to drive, relative to the repository root')
+    parser.add_argument('--slo-ms', type=float, default=1000.0, help='p95 rerun latency a session count must stay within to count towards capacity')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds a single rerun may take before AppTest gives up')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load_results.json')
+    args = parser.parse_args()
+
+    session_counts = [int(count) for count in args.sessions.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.data_dir:
+            data_dir = Path(args.data_dir)
+        else:
+            data_dir = write_fixtures(Path(tmp_dir) / 'data', scale=args.scale)
+        configure_data(data_dir, Path(tmp_dir) / 'cache')
+
+        import streamlit.logger
+        streamlit.logger.set_log_level('error')
+        share_test_runtime()
+
+        results = {}
+        for script in args.scripts:
+            # An untimed session first, so the levels measure reruns against loaded
+            # data rather than the one-off loads and builds.
+            run_session(script, 0, args.seed, args.timeout, threading.Barrier(1))
+
+            levels = []
+            for sessions in session_counts:
+                level = run_level(script, sessions, args.reruns, args.seed, args.timeout)
+                levels.append(level)
+                print(f"{script:28} {sessions:>4} sessions  {level['throughput_rps']:7.1f} reruns/s  "
+                      f"p50 {level['p50_ms']:8.1f} ms  p95 {level['p95_ms']:8.1f} ms  "
+                      f"rss +{level['rss_growth_bytes'] / 2 ** 20:7.1f} MiB  errors {level['errors']}")
+            results[script] = {'levels': levels, 'capacity_sessions': capacity(levels, args.slo_ms)}
+
+    import pandas as pd
+    import streamlit
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'pandas': pd.__version__,
+                'streamlit': streamlit.__version__,
+                'data': str(args.data_dir) if args.data_dir else f'synthetic (scale={args.scale})',
+                'reruns': args.reruns,
+                'slo_ms': args.slo_ms
+            },
+            'scripts': results
+        }, f, indent=2)
+
+    for script, result in results.items():
+        print(f"{script:28} capacity {result['capacity_sessions']} sessions at p95 <= {args.slo_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import base64
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fixtures import write_fixtures
+
+
+DATA_TYPES = ['tuition_cost', 'tuition_income', 'salary_potential', 'historical_tuition', 'diversity_school']
+
+
+def configure_data(data_dir: str, cache_dir: str):
+    # Must run before the pages are imported: data_loader reads its settings once.
+    os.environ['TUITION_DATA_DIR'] = str(data_dir)
+    os.environ['TUITION_CACHE_DIR'] = str(cache_dir)
+    os.environ['TUITION_OFFLINE'] = '1'
+
+
+def figure_rows(fig):
+    rows = 0
+    for trace in fig.data:
+        values = getattr(trace, 'x', None)
+        if values is None:
+            values = getattr(trace, 'locations', None)
+        if isinstance(values, dict) and 'bdata' in values:
+            # Figures read back from the figure cache keep arrays base64-encoded.
+            rows += len(base64.b64decode(values['bdata'])) // np.dtype(values['dtype']).itemsize
+        elif values is not None:
+            rows += len(values)
+    return rows
+
+
+def frame_rows(df):
+    return len(df)
+
+
+class Recorder:
+    def __init__(self, repeats: int, trace_memory: bool):
+        self.repeats = repeats
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.runs = []
+
+    def measure(self, stage: str, func, rows_of, widgets=None):
+        samples = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            result = func()
+            samples.append(time.perf_counter() - start)
+
+        peak = None
+        if self.trace_memory:
+            del result
+            gc.collect()
+            tracemalloc.start()
+            result = func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        rows = rows_of(result)
+        stage_stats = self.stages.setdefault(stage, {'samples': [], 'peak_memory_bytes': 0, 'rows': []})
+        stage_stats['samples'].extend(samples)
+        stage_stats['rows'].append(rows)
+        if peak is not None:
+            stage_stats['peak_memory_bytes'] = max(stage_stats['peak_memory_bytes'], peak)
+
+        self.runs.append({
+            'stage': stage,
+            'widgets': widgets,
+            'p50_ms': float(np.percentile(samples, 50)) * 1000,
+            'peak_memory_bytes': peak,
+            'rows': rows
+        })
+        return result
+
+    def summary(self):
+        summary = {}
+        for stage, stats in self.stages.items():
+            samples = np.array(stats['samples']) * 1000
+            summary[stage] = {
+                'samples': len(samples),
+                'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95)),
+                'mean_ms': float(samples.mean()),
+                'max_ms': float(samples.max()),
+                'peak_memory_bytes': stats['peak_memory_bytes'] if self.trace_memory else None,
+                'rows': int(sum(stats['rows'])),
+                'rows_per_call': float(np.mean(stats['rows']))
+            }
+        return summary
+
+
+def bench_data_layer(recorder: Recorder, data_dir: Path):
+    import pandas as pd
+
+    import data_loader
+    import income_levels
+    import schools
+    import us_map
+
+    tables = {}
+    for data_type in DATA_TYPES:
+        recorder.measure(f'load_csv:{data_type}', lambda: pd.read_csv(data_dir / f'{data_type}.csv'), frame_rows)
+        data_loader.load_data(data_type)
+        tables[data_type] = recorder.measure(f'load:{data_type}', lambda: data_loader.load_data(data_type), frame_rows)
+
+    school_dim = recorder.measure('schools:dim', lambda: schools.build_school_dim(tables['tuition_cost']), frame_rows)
+    facts = {}
+    for data_type in ['tuition_cost', 'tuition_income', 'salary_potential', 'diversity_school']:
+        facts[data_type] = recorder.measure(
+            f'schools:fact:{data_type}', lambda: schools.build_fact_table(data_type, tables[data_type], school_dim), frame_rows
+        )
+
+    recorder.measure('us_map:cube', lambda: us_map.build_state_cube(
+        school_dim, facts['tuition_cost'], facts['salary_potential'], facts['diversity_school']
+    ), frame_rows)
+
+    manifest = data_loader.load_manifest('tuition_income')
+    for year in manifest['partitions']:
+        df2 = income_levels.get_df2(int(year))
+        recorder.measure('income_levels:median_tables', lambda: income_levels.build_median_tables(df2),
+                         lambda tables: sum(len(tables[col]) for col in income_levels.split_cols), {'year': int(year)})
+
+
+def bench_pages(recorder: Recorder):
+    import diversity
+    import tuition_income_level
+    import tuition_salary
+    import us_map
+    from figure_cache import figure_cache
+    from schools import get_fact_table, get_school_dim
+
+    figure_cache.clear()
+
+    def run_page(page: str, produce_plot, data_func, combos, arg_names):
+        for combo in combos:
+            widgets = dict(zip(arg_names, combo))
+            recorder.measure(f'{page}:data', lambda: data_func(*combo), frame_rows, widgets)
+            recorder.measure(f'{page}:figure', lambda: produce_plot.__wrapped__(*combo), figure_rows, widgets)
+            produce_plot(*combo)
+            recorder.measure(f'{page}:cached_figure', lambda: produce_plot(*combo), figure_rows, widgets)
+
+    def salary_data(color_col, x_col, y_col):
+        return tuition_salary.get_df1(get_school_dim(), get_fact_table('tuition_cost'),
+                                      get_fact_table('salary_potential'), get_fact_table('diversity_school'))
+
+    run_page('tuition_salary', tuition_salary.produce_plot1, salary_data, tuition_salary.widget_combinations(),
+             ['color_col', 'x_col', 'y_col'])
+
+    split_dict = {'Region': 'region', 'Type': 'type', 'Total Cost': 'cost_bin'}
+
+    def income_data(chosen_year, split_name):
+        return tuition_income_level.get_plot_df(chosen_year, split_dict[split_name])
+
+    run_page('tuition_income_level', tuition_income_level.produce_plot2, income_data, tuition_income_level.widget_combinations(),
+             ['chosen_year', 'split_name'])
+
+    def diversity_data(div_type, x_type):
+        return diversity.get_dfs(div_type, diversity.X_COLUMNS[x_type])
+
+    run_page('diversity', diversity.produce_plot, diversity_data, diversity.widget_combinations(),
+             ['div_type', 'x_type'])
+
+    run_page('us_map', us_map.produce_plot, us_map.get_df, us_map.widget_combinations(),
+             ['type_list', 'length_list', 'data_choice'])
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['stages']
+
+    print(f'{"stage":45} {"base p50":>10} {"p50":>10} {"change":>8}')
+    for stage, stats in results['stages'].items():
+        if stage not in baseline:
+            continue
+        before, after = baseline[stage]['p50_ms'], stats['p50_ms']
+        change = (after - before) / before * 100 if before else 0.0
+        print(f'{stage:45} {before:10.2f} {after:10.2f} {change:+7.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every page over its full widget matrix without the network.')
+    parser.add_argument('--data-dir', help='Folder with local copies of the TidyTuesday CSVs; synthetic fixtures are generated when omitted')
+    parser.add_argument('--scale', type=float, default=1.0, help='Row-count multiplier for generated fixtures')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed calls per stage and widget combination')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass used for peak memory')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier results file to print p50 changes against')
+    parser.add_argument('--backend', choices=['pandas', 'arrow'], default=os.environ.get('TUITION_BACKEND', 'pandas'),
+                        help='Execution backend for joins and grouped aggregations')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.data_dir:
+            data_dir = Path(args.data_dir)
+        else:
+            data_dir = write_fixtures(Path(tmp_dir) / 'data', scale=args.scale)
+        configure_data(data_dir, Path(tmp_dir) / 'cache')
+        os.environ['TUITION_BACKEND'] = args.backend
+
+        import streamlit.logger
+        streamlit.logger.set_log_level('error')
+
+        recorder = Recorder(args.repeats, not args.no_memory)
+        bench_data_layer(recorder, data_dir)
+        bench_pages(recorder)
+
+    import pandas as pd
+    import plotly
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'plotly': plotly.__version__,
+            'data': str(args.data_dir) if args.data_dir else f'synthetic (scale={args.scale})',
+            'repeats': args.repeats,
+            'backend': args.backend
+        },
+        'stages': recorder.summary(),
+        'runs': recorder.runs
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import functools
+import os
+import threading
+import time
+
+import pandas as pd
+
+
+# Upper bound on the bytes held by every process-wide cache together: the shared
+# tables, the per-year aggregates and the built figures. Past it the cheapest entries
+# to rebuild per byte are dropped, and are recomputed if they are asked for again.
+BUDGET_BYTES = int(float(os.environ.get('TUITION_CACHE_BUDGET_MB', 1024)) * 2 ** 20)
+
+
+def object_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(object_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(object_bytes(v) for v in value)
+    return 64
+
+
+class CacheManager:
+    def __init__(self, budget_bytes: int = BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.entries = {}
+        self.compute_locks = {}
+        self.namespaces = {}
+        self.resident_bytes = 0
+        # GreedyDual-Size: an entry's priority is the clock at its last use plus its
+        # build time per byte. Evicting the lowest priority advances the clock, so
+        # entries that are cheap to rebuild, large, or long unused go first.
+        self.clock = 0.0
+        self.lock = threading.Lock()
+
+    def _counters(self, namespace: str):
+        return self.namespaces.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0})
+
+    def _priority(self, entry: dict):
+        return self.clock + entry['cost'] / max(entry['size'], 1)
+
+    def get(self, namespace: str, key):
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            counters = self._counters(namespace)
+            if entry is None:
+                counters['misses'] += 1
+                return None
+            counters['hits'] += 1
+            entry['priority'] = self._priority(entry)
+            return entry['value']
+
+    def peek(self, namespace: str, key):
+        # A lookup that neither counts as a hit or miss nor refreshes the entry.
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            return None if entry is None else entry['value']
+
+    def compute_lock(self, namespace: str, key):
+        # Callers missing on the same entry (or the startup warm-up building it)
+        # wait for one build instead of each building their own.
+        with self.lock:
+            return self.compute_locks.setdefault((namespace, key), threading.Lock())
+
+    def put(self, namespace: str, key, value, size: int, cost: float):
+        with self.lock:
+            if size > self.budget_bytes:
+                self._counters(namespace)['rejected'] += 1
+                return False
+
+            self._remove((namespace, key))
+            entry = {'value': value, 'size': size, 'cost': cost}
+            entry['priority'] = self._priority(entry)
+            self.entries[(namespace, key)] = entry
+            self.resident_bytes += size
+
+            while self.resident_bytes > self.budget_bytes:
+                victim = min(self.entries, key=lambda k: self.entries[k]['priority'])
+                self.clock = self.entries[victim]['priority']
+                self._remove(victim)
+                self._counters(victim[0])['evictions'] += 1
+            return True
+
+    def _remove(self, full_key: tuple):
+        entry = self.entries.pop(full_key, None)
+        if entry is not None:
+            self.resident_bytes -= entry['size']
+            self.compute_locks.pop(full_key, None)
+
+    def drop(self, namespace: str):
+        with self.lock:
+            for full_key in [full_key for full_key in self.entries if full_key[0] == namespace]:
+                self._remove(full_key)
+            for full_key in [full_key for full_key in self.compute_locks if full_key[0] == namespace]:
+                del self.compute_locks[full_key]
+
+    def get_or_compute(self, namespace: str, key, compute):
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        with self.compute_lock(namespace, key):
+            value = self.peek(namespace, key)
+            if value is None:
+                start = time.perf_counter()
+                value = compute()
+                self.put(namespace, key, value, object_bytes(value), time.perf_counter() - start)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.compute_locks.clear()
+            self.namespaces.clear()
+            self.resident_bytes = 0
+            self.clock = 0.0
+
+    def stats(self):
+        with self.lock:
+            namespaces = {}
+            for namespace, counters in self.namespaces.items():
+                entries = [entry for full_key, entry in self.entries.items() if full_key[0] == namespace]
+                lookups = counters['hits'] + counters['misses']
+                namespaces[namespace] = {
+                    **counters,
+                    'entries': len(entries),
+                    'resident_bytes': sum(entry['size'] for entry in entries),
+                    'hit_rate': counters['hits'] / lookups if lookups else 0.0
+                }
+            hits = sum(counters['hits'] for counters in self.namespaces.values())
+            lookups = hits + sum(counters['misses'] for counters in self.namespaces.values())
+            return {
+                'budget_bytes': self.budget_bytes,
+                'resident_bytes': self.resident_bytes,
+                'entries': len(self.entries),
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'namespaces': namespaces
+            }
+
+
+cache_manager = CacheManager()
+
+
+def cached(namespace: str):
+    # Process-wide memoisation of a function's result under the shared budget; the
+    # arguments, which must be hashable, are the key.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            return cache_manager.get_or_compute(namespace, args, lambda: func(*args))
+
+        return wrapper
+
+    return decorator
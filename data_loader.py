@@ -0,0 +1,293 @@
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrumentation import stage
+
+
+BASE_URL = 'https://raw.githubusercontent.com/rfordatascience/tidytuesday/main/data/2020/2020-03-10'
+
+# Where the Parquet copies live. Set TUITION_DATA_DIR to a folder holding the raw
+# CSVs (tuition_cost.csv, ...) to run without the network, and TUITION_OFFLINE=1
+# to never contact the upstream host and serve whatever is already cached.
+CACHE_DIR = Path(os.environ.get('TUITION_CACHE_DIR', Path(__file__).resolve().parent / '.data_cache'))
+DATA_DIR = os.environ.get('TUITION_DATA_DIR')
+OFFLINE = os.environ.get('TUITION_OFFLINE', '0') == '1'
+# Seconds between conditional requests to the upstream host for the same dataset.
+REFRESH_INTERVAL = int(os.environ.get('TUITION_REFRESH_INTERVAL', 3600))
+
+# Arrow IPC snapshot written by `python snapshot.py`. Its files are memory-mapped,
+# so every server process on a host reads the same pages of the OS page cache
+# instead of parsing its own copy.
+SNAPSHOT_DIR = Path(os.environ.get('TUITION_SNAPSHOT_DIR', CACHE_DIR / 'snapshot'))
+
+# Datasets that are also stored split by one column, so a page can read a single
+# slice of them instead of the whole table.
+PARTITION_COLS = {'tuition_income': 'year'}
+
+# One lock per dataset so concurrent sessions (or the startup warm-up) wait for a
+# refresh already in progress instead of downloading and converting it again.
+_refresh_locks = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _refresh_lock(data_type: str):
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(data_type, threading.Lock())
+
+
+def _parquet_path(data_type: str):
+    return CACHE_DIR / f'{data_type}.parquet'
+
+
+def _meta_path(data_type: str):
+    return CACHE_DIR / f'{data_type}.json'
+
+
+def _read_meta(data_type: str):
+    try:
+        with open(_meta_path(data_type)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_cache(data_type: str, data: pd.DataFrame, meta: dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so a concurrent reader never sees half a file.
+    parquet_path = _parquet_path(data_type)
+    tmp_path = parquet_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    data.to_parquet(tmp_path, engine='pyarrow', index=False)
+    os.replace(tmp_path, parquet_path)
+
+    _write_meta(data_type, meta)
+
+
+def _write_meta(data_type: str, meta: dict):
+    _write_json(_meta_path(data_type), meta)
+
+
+def _write_json(path: Path, content: dict):
+    tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _refresh_from_local(data_type: str, meta: dict):
+    csv_path = Path(DATA_DIR) / f'{data_type}.csv'
+    if not csv_path.exists():
+        if _parquet_path(data_type).exists():
+            return
+        raise FileNotFoundError(f'{csv_path} does not exist and no cached copy of {data_type} is available')
+
+    stat = csv_path.stat()
+    source = {'source': str(csv_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if _parquet_path(data_type).exists() and all(meta.get(k) == v for k, v in source.items()):
+        return
+
+    data = pd.read_csv(csv_path)
+    _write_cache(data_type, data, source)
+
+
+def _refresh_from_remote(data_type: str, meta: dict):
+    has_cache = _parquet_path(data_type).exists()
+    if has_cache and (OFFLINE or time.time() - meta.get('checked_at', 0) < REFRESH_INTERVAL):
+        return
+    if OFFLINE:
+        raise FileNotFoundError(f'offline mode is on and no cached copy of {data_type} is available in {CACHE_DIR}')
+
+    url = f'{BASE_URL}/{data_type}.csv'
+    request = urllib.request.Request(url)
+    if has_cache and meta.get('source') == url:
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            _write_meta(data_type, {**meta, 'checked_at': time.time()})
+            return
+        if has_cache:
+            _write_meta(data_type, {**meta, 'checked_at': time.time()})
+            return
+        raise
+    except (http.client.HTTPException, OSError):
+        # Upstream is unreachable or the body was cut short: keep serving the stale copy
+        # rather than failing the page, and count the attempt as a check so the next
+        # one waits a full interval instead of blocking every rerun on the timeout.
+        if has_cache:
+            _write_meta(data_type, {**meta, 'checked_at': time.time()})
+            return
+        raise
+
+    data = pd.read_csv(BytesIO(body))
+    _write_cache(data_type, data, {
+        'source': url,
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'checked_at': time.time()
+    })
+
+
+def refresh_data(data_type: str):
+    with _refresh_lock(data_type):
+        meta = _read_meta(data_type)
+
+        if DATA_DIR:
+            _refresh_from_local(data_type, meta)
+        else:
+            _refresh_from_remote(data_type, meta)
+
+    # The Parquet file is only ever replaced when the source changed, so its
+    # modification time identifies the version of the data it holds.
+    return _parquet_path(data_type).stat().st_mtime_ns
+
+
+def data_version(*data_types: str):
+    return tuple(refresh_data(data_type) for data_type in data_types)
+
+
+def _read_snapshot_manifest():
+    try:
+        with open(SNAPSHOT_DIR / 'snapshot.json') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def read_snapshot(name: str, version: tuple, columns: list = None, filters: list = None):
+    # None unless the snapshot holds this table built from exactly this version of
+    # its sources, so a stale snapshot is ignored rather than served.
+    entry = _read_snapshot_manifest().get('tables', {}).get(name)
+    if entry is None or tuple(entry['version']) != tuple(version):
+        return None
+
+    try:
+        source = pa.memory_map(str(SNAPSHOT_DIR / entry['file']))
+    except FileNotFoundError:
+        return None
+
+    # Uncompressed IPC buffers point straight into the mapping; split_blocks keeps
+    # numeric columns on those buffers instead of consolidating them into copies.
+    # Columns that are not selected are never touched, so their pages are never read in.
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    return table.to_pandas(split_blocks=True)
+
+
+def load_data(data_type: str, columns: list = None, filters: list = None, use_snapshot: bool = True):
+    # columns and filters (pyarrow filter tuples, e.g. [('year', '==', 2015)]) are
+    # applied by the columnar reader, so unused columns are never decoded.
+    with stage(f'load_data:{data_type}') as record:
+        version = refresh_data(data_type)
+        data = read_snapshot(data_type, (version,), columns, filters) if use_snapshot else None
+        if data is None:
+            data = pd.read_parquet(_parquet_path(data_type), engine='pyarrow', columns=columns, filters=filters)
+        record['rows'] = len(data)
+    return data
+
+
+def _partition_dir(data_type: str):
+    return CACHE_DIR / data_type
+
+
+def _write_partitions(data_type: str, version: int):
+    partition_col = PARTITION_COLS[data_type]
+    partition_dir = _partition_dir(data_type)
+    partition_dir.mkdir(parents=True, exist_ok=True)
+
+    data = pd.read_parquet(_parquet_path(data_type), engine='pyarrow')
+
+    # File names carry the version so readers holding the previous manifest keep
+    # finding their files until the new manifest has replaced it.
+    partitions = {}
+    for value, part in data.groupby(partition_col):
+        file_name = f'{partition_col}={value}.{version}.parquet'
+        path = partition_dir / file_name
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        part.to_parquet(tmp_path, engine='pyarrow', index=False)
+        os.replace(tmp_path, path)
+        partitions[str(value)] = {'file': file_name, 'rows': len(part)}
+
+    values = data[partition_col].dropna()
+    manifest = {
+        'version': version,
+        'partition_col': partition_col,
+        'min': values.min().item() if len(values) else None,
+        'max': values.max().item() if len(values) else None,
+        'rows': len(data),
+        'partitions': partitions
+    }
+    _write_json(partition_dir / 'manifest.json', manifest)
+
+    # Other processes on the host may be writing their own files here, and readers may
+    # still hold the previous manifest, so only partitions older than the version
+    # before this one are removed.
+    versions = {}
+    for path in partition_dir.glob('*.parquet'):
+        try:
+            versions.setdefault(int(path.suffixes[-2].lstrip('.')), []).append(path)
+        except (IndexError, ValueError):
+            continue
+    for old_version in sorted(v for v in versions if v < version)[:-1]:
+        for path in versions[old_version]:
+            path.unlink(missing_ok=True)
+
+    return manifest
+
+
+def _read_manifest(data_type: str):
+    try:
+        with open(_partition_dir(data_type) / 'manifest.json') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def load_manifest(data_type: str):
+    version = refresh_data(data_type)
+
+    manifest = _read_manifest(data_type)
+    if manifest.get('version') != version:
+        with _refresh_lock(f'{data_type}/partitions'):
+            # Another thread may have written the partitions while this one waited.
+            manifest = _read_manifest(data_type)
+            if manifest.get('version') != version:
+                manifest = _write_partitions(data_type, version)
+
+    return manifest
+
+
+def load_partition(data_type: str, value, columns: list = None):
+    with stage(f'load_partition:{data_type}={value}') as record:
+        manifest = load_manifest(data_type)
+        partition = manifest['partitions'].get(str(value))
+
+        if partition is None:
+            # No file for this value: the filtered read of the whole table comes back
+            # empty but with the right columns and dtypes.
+            data = load_data(data_type, columns=columns, filters=[(manifest['partition_col'], '==', value)])
+        else:
+            data = pd.read_parquet(_partition_dir(data_type) / partition['file'], engine='pyarrow', columns=columns)
+        record['rows'] = len(data)
+    return data
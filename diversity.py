@@ -1,119 +1,114 @@
-import streamlit as st
+import itertools
+
 import pandas as pd
-import numpy as np
-import plotly.express as px
-
-
-def load_data(data_type: str):
-    data = pd.read_csv(f'https://raw.githubusercontent.com/rfordatascience/tidytuesday/main/data/2020/2020-03-10/{data_type}.csv')
-    return data
-
-
-def set_regions_divisions(df: pd.DataFrame):
-    region_dict = {
-        'Northeast': ['New England', 'Middle Atlantic'],
-        'Midwest': ['East North Central', 'West North Central'],
-        'South': ['South Atlantic', 'East South Central', 'West South Central'],
-        'West': ['Mountain', 'Pacific']
-    }
-    division_dict = {
-        'New England': ['Connecticut', 'Maine', 'Massachusetts', 'New Hampshire', 'Rhode Island', 'Vermont'],
-        'Middle Atlantic': ['New Jersey', 'New York', 'Pennsylvania'],
-        'East North Central': ['Illinois', 'Indiana', 'Michigan', 'Ohio', 'Wisconsin'],
-        'West North Central': ['Iowa', 'Kansas', 'Minnesota', 'Missouri', 'Nebraska', 'North Dakota', 'South Dakota'],
-        'South Atlantic': ['Delaware', 'District of Columbia', 'Florida', 'Georgia', 'Maryland', 'North Carolina', 'South Carolina', 'Virginia', 'West Virginia'],
-        'East South Central': ['Alabama', 'Kentucky', 'Mississippi', 'Tennessee'],
-        'West South Central': ['Arkansas', 'Louisiana', 'Oklahoma', 'Texas'],
-        'Mountain': ['Arizona', 'Colorado', 'Idaho', 'Montana', 'Nevada', 'New Mexico', 'Utah', 'Wyoming'],
-        'Pacific': ['Alaska', 'California', 'Hawaii', 'Oregon', 'Washington']
-    }
-
-    inv_region_dict = {}
-    for key, lis in region_dict.items():
-        for div in lis:
-            inv_region_dict[div] = key
-
-    inv_division_dict = {}
-    for key, lis in division_dict.items():
-        for state in lis:
-            inv_division_dict[state] = key
-
-    df['division'] = df['state'].map(inv_division_dict)
-    df['region'] = df['division'].map(inv_region_dict)
-
-    return df
 
+import backend
+from cache_manager import cached
+from data_loader import data_version, read_snapshot
+from figure_cache import cached_figure
+from instrumentation import instrumented, stage
+from schools import get_fact_table, get_school_dim
+from shared import share
+from transforms import COMPLEMENT_CATEGORIES, add_complement_categories
 
-def get_dfs(div_type: str, x_type: str):
-    data_types = {'tc': 'tuition_cost', 'ti': 'tuition_income', 'sp': 'salary_potential', 'ht': 'historical_tuition', 'ds': 'diversity_school'}
 
-    tuition_cost = load_data(data_types['tc'])
-    diversity_school = load_data(data_types['ds'])
+DIV_OPTIONS = ('Race', 'Gender')
+X_OPTIONS = ('Region', 'Regional Division', 'School Type', 'Degree Length')
+X_COLUMNS = {
+    'Region': 'region',
+    'Regional Division': 'division',
+    'School Type': 'type',
+    'Degree Length': 'degree_length'
+}
+
+
+def widget_combinations():
+    return list(itertools.product(DIV_OPTIONS, X_OPTIONS))
+
 
-    sub_cost = tuition_cost[['name', 'type', 'degree_length']].copy()
+def diversity_table_name(div_type: str, x_type: str):
+    return f'diversity.{div_type}.{x_type}'
 
-    df_sub = pd.merge(sub_cost, diversity_school, how='inner', on='name')
-    df_sub = set_regions_divisions(df_sub)
+
+def build_dfs(school_dim: pd.DataFrame, diversity_school: pd.DataFrame, div_type: str, x_type: str):
+    # Only the columns the chart needs; both inputs are shared and only read here.
+    sub_school = school_dim[['school_id', 'name', x_type]]
+    sub_div = diversity_school[['school_id', 'category', 'enrollment', 'total_enrollment']]
+
+    df_sub = backend.merge(sub_school, sub_div, how='inner', on='school_id')
 
     if div_type == 'Gender':
-        df = df_sub[df_sub['category'] == 'Women'].reset_index(drop=True)
-
-        men_rows = []
-        for _, row in df.iterrows():
-            men_enrollment = row['total_enrollment'] - row['enrollment']
-            temp_df = pd.DataFrame({
-                'name': row['name'],
-                'total_enrollment': row['total_enrollment'],
-                'state': row['state'],
-                'category': ['Men'],
-                'enrollment': [men_enrollment],
-                'type': row['type'],
-                'degree_length': row['degree_length'],
-                'division': row['division'],
-                'region': row['region']
-            })
-            men_rows.append(temp_df)
-
-        df = pd.concat([df] + men_rows, ignore_index=True).sort_values(by='name').reset_index(drop=True)
+        df = add_complement_categories(df_sub[df_sub['category'] == COMPLEMENT_CATEGORIES['Men']], COMPLEMENT_CATEGORIES)
+        df = df.sort_values(by='name', kind='stable')
 
     else:
-        df = df_sub[(df_sub['category'] != 'Women') & (df_sub['category'] != 'Total Minority')].reset_index(drop=True)
+        df = df_sub[~df_sub['category'].isin(['Women', 'Total Minority'])]
 
-    df['enrollment_percent'] = (df['enrollment'] / df['total_enrollment']) * 100
-    df['avg_percent'] = df.groupby([x_type, 'category'])['enrollment_percent'].transform('mean')
-    stat_df = df[['category', x_type, 'avg_percent']].drop_duplicates().reset_index(drop=True)
+    df = df[[x_type, 'category']].assign(enrollment_percent=(df['enrollment'] / df['total_enrollment']) * 100)
+    # Groups in order of first appearance, as the chart has always drawn them.
+    with stage('groupby:mean'):
+        stat_df = backend.group_agg(df, [x_type, 'category'], {'avg_percent': ('enrollment_percent', 'mean')}, sort=False)
+    stat_df = stat_df[['category', x_type, 'avg_percent']]
 
     return stat_df
 
 
+def update_dfs(stat_df: pd.DataFrame, school_dim: pd.DataFrame, diversity_school: pd.DataFrame, div_type: str, x_type: str, groups: set):
+    # Recomputes the means of the given x_type values from the rows of their schools
+    # alone; the fact table only needs to cover those schools. Bars keep their place, so
+    # no school may have joined, left or moved between groups since stat_df was built.
+    fresh = build_dfs(school_dim[school_dim[x_type].isin(groups)], diversity_school, div_type, x_type)
+    means = stat_df[[x_type, 'category']].merge(fresh, how='left', on=[x_type, 'category'])['avg_percent']
+
+    return stat_df.assign(avg_percent=stat_df['avg_percent'].where(~stat_df[x_type].isin(groups), means.to_numpy()))
+
+
+@cached('diversity_means')
+def _diversity_means(div_type: str, x_type: str, version: tuple):
+    name = diversity_table_name(div_type, x_type)
+    stat_df = read_snapshot(name, version)
+    if stat_df is None:
+        stat_df = build_dfs(get_school_dim(), get_fact_table('diversity_school'), div_type, x_type)
+    return share(name, stat_df)
+
+
+@instrumented('get_dfs')
+def get_dfs(div_type: str, x_type: str):
+    return _diversity_means(div_type, x_type, data_version('tuition_cost', 'diversity_school'))
+
+
+@cached_figure('diversity', ('tuition_cost', 'diversity_school'))
 def produce_plot(div_type: str, x_type: str):
-    x_dict = {
-        'Region': 'region',
-        'Regional Division': 'division',
-        'School Type': 'type',
-        'Degree Length': 'degree_length'
-    }
+    div_df = get_dfs(div_type, X_COLUMNS[x_type])
 
-    div_df = get_dfs(div_type, x_dict[x_type])
+    with stage('figure'):
+        import plotly.express as px
 
-    fig = px.bar(
-        div_df, x=x_dict[x_type], y='avg_percent', color='category',
-        labels={"avg_percent": "Average Percent", "region": "Region", "category": "Category",
-                "division": "Regional Division", "type": "School Type", "degree_length": "Degree Length"}
-    )
+        fig = px.bar(
+            div_df, x=X_COLUMNS[x_type], y='avg_percent', color='category',
+            labels={"avg_percent": "Average Percent", "region": "Region", "category": "Category",
+                    "division": "Regional Division", "type": "School Type", "degree_length": "Degree Length"}
+        )
 
     return fig
 
-title = st.header("Diversity Statistics")
 
-choose_div_selectbox = st.sidebar.selectbox(
-    'Diversity Type:', ('Race', 'Gender')
-)
+if __name__ == "__main__":
+    import streamlit as st
+
+    from fragments import chart_fragment
+
+    title = st.header("Diversity Statistics")
+
+    def controls():
+        choose_div_selectbox = st.selectbox(
+            'Diversity Type:', DIV_OPTIONS
+        )
 
-add_x_selectbox = st.sidebar.selectbox(
-    'X-Axis:', ('Region', 'Regional Division', 'School Type', 'Degree Length')
-)
+        add_x_selectbox = st.selectbox(
+            'X-Axis:', X_OPTIONS
+        )
 
-fig = produce_plot(choose_div_selectbox, add_x_selectbox)
+        return choose_div_selectbox, add_x_selectbox
 
-chart = st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    chart_fragment('diversity', controls, produce_plot)
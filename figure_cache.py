@@ -0,0 +1,116 @@
+import functools
+import inspect
+import threading
+import time
+
+from cache_manager import CacheManager, cache_manager
+from data_loader import data_version
+from instrumentation import stage
+
+
+def normalize_widget_value(value):
+    # Multiselect order does not change the chart, and numpy scalars should key the
+    # same entry as the equivalent Python value.
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(normalize_widget_value(v) for v in value))
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class FigureCache:
+    # Built figures are shared by every session of the server process, so the same few
+    # widget combinations are only rendered once per data version. They are held as
+    # JSON in the cache manager, one namespace per page, under its memory budget.
+    def __init__(self, manager: CacheManager):
+        self.manager = manager
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def namespace(page: str):
+        return f'figure:{page}'
+
+    @staticmethod
+    def key(widgets: dict):
+        return tuple(sorted((k, normalize_widget_value(v)) for k, v in widgets.items()))
+
+    def _invalidate_page(self, page: str, snapshot):
+        # Drop every figure built from older data.
+        with self.lock:
+            if self.snapshots.get(page) == snapshot:
+                return
+            self.manager.drop(self.namespace(page))
+            self.snapshots[page] = snapshot
+
+    def get(self, page: str, widgets: dict, snapshot):
+        self._invalidate_page(page, snapshot)
+        key = self.key(widgets)
+        return key, self.manager.get(self.namespace(page), key)
+
+    def peek(self, page: str, key: tuple):
+        return self.manager.peek(self.namespace(page), key)
+
+    def contains(self, page: str, widgets: dict, snapshot):
+        with self.lock:
+            if self.snapshots.get(page) != snapshot:
+                return False
+        return self.peek(page, self.key(widgets)) is not None
+
+    def compute_lock(self, page: str, key: tuple):
+        return self.manager.compute_lock(self.namespace(page), key)
+
+    def put(self, page: str, key: tuple, snapshot, fig_json: str, cost: float):
+        # The data may have changed while the figure was being built. The check and the
+        # store share the lock _invalidate_page takes, so a newer version cannot drop
+        # the namespace in between and leave this figure under its keys.
+        with self.lock:
+            if self.snapshots.get(page) != snapshot:
+                return
+            self.manager.put(self.namespace(page), key, fig_json, len(fig_json), cost)
+
+    def clear(self):
+        with self.lock:
+            for page in self.snapshots:
+                self.manager.drop(self.namespace(page))
+            self.snapshots.clear()
+
+
+figure_cache = FigureCache(cache_manager)
+
+
+def cached_figure(page: str, data_types: tuple):
+    def decorator(produce_plot):
+        signature = inspect.signature(produce_plot)
+
+        @functools.wraps(produce_plot)
+        def wrapper(*args, **kwargs):
+            widgets = signature.bind(*args, **kwargs).arguments
+            snapshot = data_version(*data_types)
+
+            with stage('figure_cache') as record:
+                key, fig_json = figure_cache.get(page, widgets, snapshot)
+                record['cache'] = 'miss' if fig_json is None else 'hit'
+                if fig_json is None:
+                    with figure_cache.compute_lock(page, key):
+                        fig_json = figure_cache.peek(page, key)
+                        if fig_json is None:
+                            start = time.perf_counter()
+                            fig = produce_plot(*args, **kwargs)
+                            fig_json = fig.to_json()
+                            figure_cache.put(page, key, snapshot, fig_json, time.perf_counter() - start)
+                            return fig
+
+                # Every caller gets its own Figure, so nothing can modify the cached copy.
+                import plotly.io as pio
+
+                return pio.from_json(fig_json)
+
+        def is_cached(*args, **kwargs):
+            widgets = signature.bind(*args, **kwargs).arguments
+            return figure_cache.contains(page, widgets, data_version(*data_types))
+
+        wrapper.is_cached = is_cached
+        return wrapper
+
+    return decorator
@@ -0,0 +1,35 @@
+import streamlit as st
+
+from instrumentation import finish_run, render_debug_panel, start_run
+
+
+# Streamlit runs each page script as __main__, so the pages draw, and import this
+# module and Streamlit, only inside their `if __name__ == "__main__"` block. The
+# warm-up, snapshot.py and prerender.py import the same pages for their figure
+# functions without loading Streamlit; plotly is loaded once a chart is built.
+
+
+def chart_fragment(page: str, controls, produce_plot):
+    # The sidebar controls and the chart computation rerun together as one fragment,
+    # so a widget change reruns only them and not the page script around them. The
+    # chart is drawn into a placeholder in the main area outside the fragment, where
+    # the previous chart stays up until the new one replaces it.
+    status = st.empty()
+    chart = st.empty()
+
+    @st.fragment
+    def run():
+        start_run(page)
+
+        args = controls()
+        if not produce_plot.is_cached(*args):
+            status.caption(':material/hourglass_top: Updating chart...')
+        fig = produce_plot(*args)
+
+        chart.plotly_chart(fig, use_container_width=True)
+        status.empty()
+
+        render_debug_panel(finish_run())
+
+    with st.sidebar:
+        run()
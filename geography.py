@@ -0,0 +1,55 @@
+import pandas as pd
+import numpy as np
+
+
+# Census regions and divisions, plus the territories that appear in the tuition data.
+region_dict = {
+    'Northeast': ['New England', 'Middle Atlantic'],
+    'Midwest': ['East North Central', 'West North Central'],
+    'South': ['South Atlantic', 'East South Central', 'West South Central'],
+    'West': ['Mountain', 'Pacific'],
+    'Territories': ['Territories']
+}
+division_dict = {
+    'New England': {'CT': 'Connecticut', 'ME': 'Maine', 'MA': 'Massachusetts', 'NH': 'New Hampshire', 'RI': 'Rhode Island', 'VT': 'Vermont'},
+    'Middle Atlantic': {'NJ': 'New Jersey', 'NY': 'New York', 'PA': 'Pennsylvania'},
+    'East North Central': {'IL': 'Illinois', 'IN': 'Indiana', 'MI': 'Michigan', 'OH': 'Ohio', 'WI': 'Wisconsin'},
+    'West North Central': {'IA': 'Iowa', 'KS': 'Kansas', 'MN': 'Minnesota', 'MO': 'Missouri', 'NE': 'Nebraska', 'ND': 'North Dakota', 'SD': 'South Dakota'},
+    'South Atlantic': {'DE': 'Delaware', 'DC': 'District of Columbia', 'FL': 'Florida', 'GA': 'Georgia', 'MD': 'Maryland', 'NC': 'North Carolina',
+                       'SC': 'South Carolina', 'VA': 'Virginia', 'WV': 'West Virginia'},
+    'East South Central': {'AL': 'Alabama', 'KY': 'Kentucky', 'MS': 'Mississippi', 'TN': 'Tennessee'},
+    'West South Central': {'AR': 'Arkansas', 'LA': 'Louisiana', 'OK': 'Oklahoma', 'TX': 'Texas'},
+    'Mountain': {'AZ': 'Arizona', 'CO': 'Colorado', 'ID': 'Idaho', 'MT': 'Montana', 'NV': 'Nevada', 'NM': 'New Mexico', 'UT': 'Utah', 'WY': 'Wyoming'},
+    'Pacific': {'AK': 'Alaska', 'CA': 'California', 'HI': 'Hawaii', 'OR': 'Oregon', 'WA': 'Washington'},
+    'Territories': {'AS': 'American Samoa', 'PR': 'Puerto Rico', 'GU': 'Guam', 'VI': 'Virgin Islands', 'MP': 'Northern Mariana Islands'}
+}
+
+
+def build_geography():
+    inv_region_dict = {div: key for key, lis in region_dict.items() for div in lis}
+    rows = [(code, state, division, inv_region_dict[division])
+            for division, states in division_dict.items() for code, state in states.items()]
+
+    geography = pd.DataFrame(rows, columns=['state_code', 'state', 'division', 'region'])
+    for col in geography.columns:
+        geography[col] = geography[col].astype('category')
+
+    return geography
+
+
+# Built once at import: one row per state or territory, every column a Categorical.
+geography = build_geography()
+
+
+def enrich_geography(state_code: pd.Series):
+    # Position of each value in the lookup (-1 when unknown), then every geo column is
+    # a single take on the lookup's category codes rather than a string map per column.
+    positions = pd.Categorical(state_code, categories=geography['state_code'].astype(str)).codes
+
+    enriched = {}
+    for col in ['state', 'division', 'region']:
+        lookup_codes = geography[col].cat.codes.to_numpy()
+        codes = np.where(positions >= 0, lookup_codes[positions], -1)
+        enriched[col] = pd.Categorical.from_codes(codes, dtype=geography[col].dtype)
+
+    return pd.DataFrame(enriched, index=state_code.index)
@@ -0,0 +1,113 @@
+import pandas as pd
+
+import backend
+from cache_manager import cached
+from data_loader import data_version, read_snapshot
+from instrumentation import instrumented, stage
+from schools import get_fact_table, get_school_dim
+from shared import share
+
+
+order_dict = {
+    '0 to 30,000': 0,
+    '30,001 to 48,000': 1,
+    '48,001 to 75,000': 2,
+    '75,001 to 110,000': 3,
+    'Over 110,000': 4
+}
+split_cols = ['type', 'region', 'cost_bin']
+# What one year's median tables are stored as in the snapshot.
+median_table_names = split_cols + ['cost_bin_edges']
+
+
+def build_df2(school_dim: pd.DataFrame, tuition_income: pd.DataFrame):
+    sub_school = school_dim[['school_id', 'state', 'type', 'division', 'region']]
+    sub_income = tuition_income[['school_id', 'total_price', 'year', 'campus', 'net_cost', 'income_lvl']]
+
+    df2 = backend.merge(sub_income, sub_school, on='school_id', how='inner')
+    return df2
+
+
+@instrumented('get_df2')
+def get_df2(year: int):
+    data_types = {'tc': 'tuition_cost', 'ti': 'tuition_income', 'sp': 'salary_potential', 'ht': 'historical_tuition', 'ds': 'diversity_school'}
+
+    school_dim = get_school_dim()
+    tuition_income = get_fact_table(data_types['ti'], partition=year)
+
+    return build_df2(school_dim, tuition_income)
+
+
+@instrumented('build_median_tables')
+def build_median_tables(df2: pd.DataFrame):
+    percent_cost = (df2['net_cost'] / df2['total_price'].mask(lambda x: x == 0)) * 100
+    in_range = (percent_cost <= 100) & (percent_cost >= 0)
+
+    temp_df = df2.loc[in_range, ['type', 'region', 'income_lvl', 'total_price']]
+    temp_df = temp_df.assign(percent_cost=percent_cost[in_range])
+
+    # The quintile edges only depend on the year, so they are computed once and
+    # shared by every split.
+    tables = {'cost_bin_edges': None}
+    if len(temp_df):
+        cost_bin, edges = backend.qcut(temp_df['total_price'], q=5)
+        temp_df = temp_df.assign(cost_bin=cost_bin)
+        tables['cost_bin_edges'] = edges.tolist()
+    else:
+        temp_df = temp_df.assign(cost_bin=pd.Series(dtype='category'))
+
+    for split_col in split_cols:
+        with stage(f'groupby:median:{split_col}'):
+            plot_df = backend.group_agg(temp_df, [split_col, 'income_lvl'], {'median': ('percent_cost', 'median')})
+        plot_df['x_order'] = plot_df['income_lvl'].map(order_dict)
+        tables[split_col] = plot_df[['income_lvl', 'median', split_col, 'x_order']].sort_values(by=[split_col, 'x_order'])
+
+    return tables
+
+
+def median_table_name(year: int, name: str):
+    return f'median_tables.{year}.{name}'
+
+
+def cost_bin_dtype(edges: list):
+    # The categories backend.qcut gives for these edges.
+    if edges is None:
+        return pd.Series(dtype='category').dtype
+    return pd.cut(pd.Series([], dtype='float64'), edges, include_lowest=True).dtype
+
+
+def snapshot_median_tables(year: int, tables: dict):
+    # Arrow has no categorical of intervals, so the cost bins are stored as their
+    # codes, next to the edges they are rebuilt from.
+    cost_bin = tables['cost_bin']
+    snapshot = {median_table_name(year, split_col): tables[split_col] for split_col in ['type', 'region']}
+    snapshot[median_table_name(year, 'cost_bin')] = cost_bin.assign(cost_bin=cost_bin['cost_bin'].cat.codes)
+    snapshot[median_table_name(year, 'cost_bin_edges')] = pd.DataFrame({'edge': tables['cost_bin_edges'] or []}, dtype='float64')
+    return snapshot
+
+
+def read_median_tables(year: int, version: tuple):
+    tables = {}
+    for name in median_table_names:
+        tables[name] = read_snapshot(median_table_name(year, name), version)
+        if tables[name] is None:
+            return None
+
+    tables['cost_bin_edges'] = tables['cost_bin_edges']['edge'].tolist() or None
+    cost_bin = tables['cost_bin']
+    tables['cost_bin'] = cost_bin.assign(cost_bin=pd.Categorical.from_codes(cost_bin['cost_bin'], dtype=cost_bin_dtype(tables['cost_bin_edges'])))
+    return tables
+
+
+@cached('median_tables')
+def _median_tables(year: int, version: tuple):
+    tables = read_median_tables(year, version)
+    if tables is None:
+        tables = build_median_tables(get_df2(year))
+    for split_col in split_cols:
+        share(f'median_tables.{year}.{split_col}', tables[split_col])
+    return tables
+
+
+def get_median_tables(year: int):
+    return _median_tables(year, data_version('tuition_cost', 'tuition_income'))
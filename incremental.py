@@ -0,0 +1,189 @@
+import itertools
+from pathlib import Path
+
+import pandas as pd
+
+import data_loader
+import diversity
+from data_loader import data_version, load_data, load_manifest, load_partition
+from diversity import build_dfs, diversity_table_name, update_dfs
+from income_levels import build_df2, build_median_tables, median_table_name, median_table_names, snapshot_median_tables
+from schools import build_fact_table, build_school_dim, fact_table_name, source_cols
+from snapshot import DATA_TYPES, FACT_TYPES, build_snapshot, publish, read_manifest, read_table, write_table
+from us_map import update_state_cube
+
+
+# Columns that identify a row across two versions of a dataset. historical_tuition has
+# no school column and no page aggregates it, so it is only compared as a whole.
+ROW_KEYS = {
+    'tuition_cost': ['name'],
+    'tuition_income': ['name', 'year'],
+    'salary_potential': ['name'],
+    'diversity_school': ['name']
+}
+
+
+def diff_rows(old: pd.DataFrame, new: pd.DataFrame, keys: list):
+    # The keys whose rows were added, removed or edited, or None when the columns
+    # themselves changed. Rows are compared by hash, and the hashes under one key are
+    # summed, so rows that only moved are not a change.
+    if list(old.columns) != list(new.columns) or not old.dtypes.equals(new.dtypes):
+        return None
+
+    sums = []
+    for data in (old, new):
+        hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+        sums.append(data[keys].assign(_hash=hashes, _rows=1).groupby(keys, dropna=False).sum())
+
+    index = sums[0].index.union(sums[1].index)
+    old_sums, new_sums = (s.reindex(index, fill_value=0) for s in sums)
+    changed = (old_sums != new_sums).any(axis=1).to_numpy()
+    return index[changed].to_frame(index=False)
+
+
+def affected_values(old_dim: pd.DataFrame, school_dim: pd.DataFrame, names: set, column: str):
+    # Every value the given schools have in column, before or after the change.
+    return set(old_dim.loc[old_dim['name'].isin(names), column]) | set(school_dim.loc[school_dim['name'].isin(names), column])
+
+
+def school_facts(data_type: str, data: pd.DataFrame, school_dim: pd.DataFrame, names: pd.Series):
+    # Fact rows of the given schools only: the source rows are filtered by name before
+    # the join, so the join costs as much as those schools have rows.
+    return build_fact_table(data_type, data[data['name'].isin(names)], school_dim)
+
+
+def categories(df: pd.DataFrame):
+    return {col: df[col].cat.categories.tolist() for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+
+
+def update_snapshot(out_dir: Path = None):
+    # Brings an existing snapshot up to date with the Parquet cache. The datasets are
+    # diffed against the snapshot's copies row by row, and only the tables and aggregate
+    # cells the changed schools touch are rebuilt; every other table keeps its file and
+    # is re-stamped with the new data version. Returns the tables and the names of the
+    # ones that were rewritten.
+    out_dir = Path(out_dir or data_loader.SNAPSHOT_DIR)
+    previous = read_manifest(out_dir).get('tables', {})
+
+    def rebuild():
+        tables = build_snapshot(out_dir)
+        return tables, set(tables)
+
+    diversity_tables = [diversity_table_name(div_type, x_type)
+                        for div_type, x_type in itertools.product(diversity.DIV_OPTIONS, diversity.X_COLUMNS.values())]
+    required = DATA_TYPES + ['school_dim', 'state_cube'] + [fact_table_name(data_type) for data_type in FACT_TYPES] + diversity_tables
+    if any(name not in previous for name in required):
+        return rebuild()
+
+    old = {data_type: read_table(out_dir, previous[data_type]) for data_type in DATA_TYPES}
+    # Datasets whose version the snapshot already holds are neither read nor diffed.
+    current = {data_type: previous[data_type]['version'] == list(data_version(data_type)) for data_type in DATA_TYPES}
+    datasets = {data_type: old[data_type] if current[data_type] else load_data(data_type, use_snapshot=False) for data_type in DATA_TYPES}
+    same = {data_type: current[data_type] or old[data_type].equals(datasets[data_type]) for data_type in DATA_TYPES}
+
+    changes = {data_type: old[data_type][keys].iloc[:0] if current[data_type] else diff_rows(old[data_type], datasets[data_type], keys)
+               for data_type, keys in ROW_KEYS.items()}
+    if any(change is None for change in changes.values()):
+        return rebuild()
+    names = {data_type: set(change['name']) for data_type, change in changes.items()}
+
+    old_dim = read_table(out_dir, previous['school_dim'])
+    school_dim = build_school_dim(datasets['tuition_cost'])
+    # The aggregates are keyed by the school table's categoricals; a new category
+    # changes the dtype of every one of them.
+    if categories(old_dim) != categories(school_dim):
+        return rebuild()
+
+    # school_id is the row number in tuition_cost, so schools added, removed or moved
+    # there renumber every fact table.
+    ids_stable = old['tuition_cost']['name'].equals(datasets['tuition_cost']['name'])
+    # Schools whose attributes in the school table changed, as opposed to their costs.
+    dim_cols = [col for col in school_dim.columns if col != 'school_id']
+    dim_names = set(diff_rows(old_dim[dim_cols], school_dim[dim_cols], ['name'])['name'])
+
+    tables = {}
+    rebuilt = set()
+
+    def keep_or_write(name: str, version: tuple, changed: bool, build):
+        if changed or name not in previous:
+            tables[name] = write_table(out_dir, name, build(), version)
+            rebuilt.add(name)
+        else:
+            tables[name] = {**previous[name], 'version': list(version)}
+
+    for data_type in DATA_TYPES:
+        keep_or_write(data_type, data_version(data_type), not same[data_type], lambda: datasets[data_type])
+
+    keep_or_write('school_dim', data_version('tuition_cost'), not same['tuition_cost'], lambda: school_dim)
+
+    facts = {}
+    for data_type in FACT_TYPES:
+        def fact():
+            facts[data_type] = build_fact_table(data_type, datasets[data_type], school_dim)
+            return facts[data_type]
+
+        keep_or_write(fact_table_name(data_type), data_version('tuition_cost', data_type), not (ids_stable and same[data_type]), fact)
+
+    # Income-level medians: a year is rebuilt when one of its rows changed, or when the
+    # type or region of a school with rows in it changed. qcut bins the whole year, so
+    # its tables are rebuilt as a whole.
+    version = data_version('tuition_cost', 'tuition_income')
+    years = set(changes['tuition_income']['year'])
+    for data in (old['tuition_income'], datasets['tuition_income']):
+        years |= set(data.loc[data['name'].isin(dim_names), 'year'])
+
+    for value in load_manifest('tuition_income')['partitions']:
+        year = int(value)
+        changed = year in years or any(median_table_name(year, name) not in previous for name in median_table_names)
+
+        fact = None
+        if changed or not ids_stable:
+            fact = build_fact_table('tuition_income', load_partition('tuition_income', year, columns=source_cols['tuition_income']), school_dim)
+        keep_or_write(fact_table_name('tuition_income', year), version, fact is not None, lambda: fact)
+
+        median_tables = snapshot_median_tables(year, build_median_tables(build_df2(school_dim, fact))) if changed else {}
+        for name in median_table_names:
+            table_name = median_table_name(year, name)
+            keep_or_write(table_name, version, changed, lambda: median_tables[table_name])
+
+    # State map: only the cells of the states the changed schools are, or were, in.
+    tuition_cost = facts.get('tuition_cost')
+    if tuition_cost is None:
+        tuition_cost = build_fact_table('tuition_cost', datasets['tuition_cost'], school_dim)
+
+    states = affected_values(old_dim, school_dim, names['tuition_cost'] | names['salary_potential'] | names['diversity_school'], 'state_code')
+    state_schools = school_dim.loc[school_dim['state_code'].isin(states), 'name']
+    keep_or_write('state_cube', data_version('tuition_cost', 'salary_potential', 'diversity_school'), bool(states),
+                  lambda: update_state_cube(read_table(out_dir, previous['state_cube']), school_dim, tuition_cost,
+                                            school_facts('salary_potential', datasets['salary_potential'], school_dim, state_schools),
+                                            school_facts('diversity_school', datasets['diversity_school'], school_dim, state_schools),
+                                            states))
+
+    # Diversity: only the means of the x-axis values the changed schools fall under.
+    # Bars are drawn in the order their first school appears in, so means are only
+    # updated in place while every school keeps its place, its categories and its group;
+    # otherwise the table is rebuilt.
+    version = data_version('tuition_cost', 'diversity_school')
+    div_names = names['diversity_school']
+    pairs = [set(data.loc[data['name'].isin(div_names), ['name', 'category']].itertuples(index=False))
+             for data in (old['diversity_school'], datasets['diversity_school'])]
+    rows_stable = ids_stable and pairs[0] == pairs[1]
+
+    diversity_school = facts.get('diversity_school')
+    for div_type, x_type in itertools.product(diversity.DIV_OPTIONS, diversity.X_COLUMNS.values()):
+        name = diversity_table_name(div_type, x_type)
+        groups = affected_values(old_dim, school_dim, dim_names | div_names, x_type)
+
+        if rows_stable and old_dim[x_type].equals(school_dim[x_type]):
+            group_schools = school_dim.loc[school_dim[x_type].isin(groups), 'name']
+            keep_or_write(name, version, bool(groups),
+                          lambda: update_dfs(read_table(out_dir, previous[name]), school_dim,
+                                             school_facts('diversity_school', datasets['diversity_school'], school_dim, group_schools),
+                                             div_type, x_type, groups))
+        else:
+            if diversity_school is None:
+                diversity_school = build_fact_table('diversity_school', datasets['diversity_school'], school_dim)
+            keep_or_write(name, version, True, lambda: build_dfs(school_dim, diversity_school, div_type, x_type))
+
+    publish(out_dir, tables)
+    return tables, rebuilt
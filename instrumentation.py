@@ -0,0 +1,147 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+from shared import check_shared
+
+
+# Timing is always recorded while a page run is active; it costs two perf_counter
+# calls per stage. Memory tracing slows every allocation, so it is opt-in.
+TRACE_MEMORY = os.environ.get('TUITION_TRACE_MEMORY', '0') == '1'
+DEBUG_PANEL = os.environ.get('TUITION_DEBUG_PANEL', '0') == '1'
+# '1' logs to stderr, anything else is taken as a file path.
+METRICS_LOG = os.environ.get('TUITION_METRICS_LOG')
+
+logger = logging.getLogger('tuition.metrics')
+if METRICS_LOG and not logger.handlers:
+    handler = logging.StreamHandler() if METRICS_LOG == '1' else logging.FileHandler(METRICS_LOG)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Streamlit runs every session's script on its own thread.
+_local = threading.local()
+
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def stage(name: str):
+    run = current_run()
+    if run is None:
+        yield {}
+        return
+
+    # Appended on entry so the list stays in start order with nested stages after their parent.
+    record = {'name': name, 'depth': run['depth'], 'rows': None}
+    run['stages'].append(record)
+    run['depth'] += 1
+    memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['ms'] = (time.perf_counter() - start) * 1000
+        if memory_before is not None:
+            # Net bytes still allocated when the stage ends; other sessions' threads
+            # allocating at the same time are counted too.
+            record['allocated_bytes'] = tracemalloc.get_traced_memory()[0] - memory_before
+        run['depth'] -= 1
+
+
+def instrumented(name: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record['rows'] = len(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def start_run(page: str):
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    _local.run = {
+        'page': page,
+        'started_at': time.time(),
+        'start': time.perf_counter(),
+        'depth': 0,
+        'stages': []
+    }
+
+
+def finish_run():
+    run = current_run()
+    if run is None:
+        return None
+
+    # Every shared table must look exactly as it did when it was built. Timed as a
+    # stage of the run, so its cost is part of total_ms.
+    try:
+        with stage('check_shared'):
+            check_shared()
+    finally:
+        _local.run = None
+
+    metrics = {
+        'event': 'page_run',
+        'page': run['page'],
+        'started_at': run['started_at'],
+        'total_ms': (time.perf_counter() - run['start']) * 1000,
+        'peak_traced_bytes': tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+        'stages': run['stages']
+    }
+
+    from cache_manager import cache_manager
+    metrics['cache'] = cache_manager.stats()
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(metrics, default=str))
+
+    return metrics
+
+
+def debug_panel_enabled():
+    # Streamlit is only imported by the functions that draw, so the data layer and the
+    # offline tools built on it load without it.
+    import streamlit as st
+
+    return DEBUG_PANEL or st.query_params.get('debug') == '1'
+
+
+def render_debug_panel(metrics: dict):
+    if metrics is None or not debug_panel_enabled():
+        return
+
+    import streamlit as st
+
+    # Drawn into the current container: pages call this from their sidebar fragment.
+    with st.expander('Performance', expanded=True):
+        st.metric('Rerun time (ms)', f"{metrics['total_ms']:.1f}")
+        stages = pd.DataFrame(metrics['stages'])
+        if len(stages):
+            stages['stage'] = ['  ' * depth + name for depth, name in zip(stages['depth'], stages['name'])]
+            columns = [col for col in ['stage', 'ms', 'rows', 'allocated_bytes'] if col in stages.columns]
+            st.dataframe(stages[columns], hide_index=True, width='stretch')
+        st.json(metrics['cache'], expanded=False)
+        st.download_button('Download JSON', json.dumps(metrics, default=str), file_name=f"{metrics['page']}_metrics.json", mime='application/json')
+
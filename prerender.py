@@ -0,0 +1,115 @@
+import argparse
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+# Page module, its figure function and the datasets the figure is built from.
+PAGES = {
+    'tuition_salary': ('produce_plot1', ('tuition_cost', 'salary_potential', 'diversity_school')),
+    'tuition_income_level': ('produce_plot2', ('tuition_cost', 'tuition_income')),
+    'diversity': ('produce_plot', ('tuition_cost', 'diversity_school')),
+    'us_map': ('produce_plot', ('tuition_cost', 'salary_potential', 'diversity_school'))
+}
+
+
+def slug(args: tuple):
+    parts = []
+    for value in args:
+        if isinstance(value, (list, tuple)):
+            value = '+'.join(str(v) for v in value) or 'none'
+        parts.append(re.sub(r'[^a-z0-9+]+', '-', str(value).lower()).strip('-'))
+    return '__'.join(parts)
+
+
+def render(page: str, combos: list, out_dir: str, formats: tuple, plotlyjs: str):
+    # Runs in a worker process: loads the page's tables once and renders its share
+    # of the widget combinations, bypassing the in-memory figure cache.
+    module = importlib.import_module(page)
+    produce_plot = getattr(module, PAGES[page][0])
+    names = list(inspect.signature(produce_plot).parameters)
+
+    page_dir = Path(out_dir) / page
+    page_dir.mkdir(parents=True, exist_ok=True)
+
+    variants = []
+    for args in combos:
+        fig = produce_plot.__wrapped__(*args)
+        variant = {'widgets': dict(zip(names, args))}
+        name = slug(args)
+        if 'json' in formats:
+            (page_dir / f'{name}.json').write_text(fig.to_json())
+            variant['json'] = f'{page}/{name}.json'
+        if 'html' in formats:
+            fig.write_html(page_dir / f'{name}.html', include_plotlyjs=plotlyjs, full_html=True)
+            variant['html'] = f'{page}/{name}.html'
+        variants.append(variant)
+
+    return page, variants
+
+
+def chunks(items: list, size: int):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def prerender(out_dir: Path, pages: list, formats: tuple, workers: int, plotlyjs: str = 'cdn', chunk_size: int = 16):
+    from data_loader import data_version
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # The Parquet copies are refreshed here once, so the workers only read them.
+    tasks = []
+    manifest = {'generated_at': time.time(), 'pages': {}}
+    for page in pages:
+        module = importlib.import_module(page)
+        produce_plot = getattr(module, PAGES[page][0])
+        manifest['pages'][page] = {
+            'widgets': list(inspect.signature(produce_plot).parameters),
+            'data_version': list(data_version(*PAGES[page][1])),
+            'variants': []
+        }
+        tasks += [(page, combos) for combos in chunks(module.widget_combinations(), chunk_size)]
+
+    # spawn rather than fork: the parent has already started pandas and pyarrow threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(render, page, combos, str(out_dir), formats, plotlyjs) for page, combos in tasks]
+        for future in futures:
+            page, variants = future.result()
+            manifest['pages'][page]['variants'] += variants
+
+    # Written last, so a CDN sync never publishes an index pointing at missing files.
+    tmp_path = out_dir / f'.manifest.json.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, out_dir / 'manifest.json')
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render every widget combination of every page to static files with a manifest index.')
+    parser.add_argument('out', help='Output folder')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+    parser.add_argument('--format', choices=['json', 'html', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--plotlyjs', choices=['cdn', 'directory'], default='cdn',
+                        help='Load plotly.js from its CDN, or write one copy per page folder next to the HTML files')
+    args = parser.parse_args()
+
+    formats = ('json', 'html') if args.format == 'both' else (args.format,)
+    start = time.perf_counter()
+    manifest = prerender(Path(args.out), args.pages, formats, args.workers, args.plotlyjs)
+
+    for page, entry in manifest['pages'].items():
+        print(f"{page:24} {len(entry['variants']):>5} variants")
+    print(f'done in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
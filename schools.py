@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+
+from cache_manager import cached
+from data_loader import data_version, load_data, load_partition, read_snapshot
+from geography import enrich_geography
+from instrumentation import instrumented, stage
+from shared import share
+
+
+cost_cols = ['room_and_board', 'in_state_tuition', 'in_state_total', 'out_of_state_tuition', 'out_of_state_total']
+dim_cols = ['name', 'state', 'state_code', 'type', 'degree_length']
+# The only source columns any page uses; the rest are never read from disk.
+source_cols = {
+    'tuition_cost': cost_cols,
+    'tuition_income': ['name', 'total_price', 'year', 'campus', 'net_cost', 'income_lvl'],
+    'salary_potential': ['name', 'rank', 'early_career_pay', 'mid_career_pay'],
+    'diversity_school': ['name', 'total_enrollment', 'category', 'enrollment']
+}
+
+
+@instrumented('build_school_dim')
+def build_school_dim(tuition_cost: pd.DataFrame):
+    geo = enrich_geography(tuition_cost['state_code'])
+
+    # Codes missing from the lookup keep whatever state name the source had.
+    state = geo['state']
+    unknown = state.isnull() & tuition_cost['state'].notnull()
+    if unknown.any():
+        state = state.astype(object).where(~unknown, tuition_cost['state']).astype('category')
+
+    # One row per tuition_cost row, so school_id also indexes the tuition_cost fact table.
+    school_dim = pd.DataFrame({
+        'school_id': np.arange(len(tuition_cost), dtype='int32'),
+        'name': tuition_cost['name'].to_numpy(),
+        'state': state.array,
+        'state_code': tuition_cost['state_code'].astype('category').array,
+        'type': tuition_cost['type'].astype('category').array,
+        'degree_length': tuition_cost['degree_length'].astype('category').array,
+        'division': geo['division'].array,
+        'region': geo['region'].array
+    })
+
+    return school_dim
+
+
+@instrumented('merge:school_id')
+def attach_school_id(data: pd.DataFrame, school_dim: pd.DataFrame):
+    # The only join on the free-text name: every later join uses the integer key.
+    # Inner, so rows of schools missing from tuition_cost are dropped here once.
+    keyed = pd.merge(school_dim[['school_id', 'name']], data, how='inner', on='name')
+    return keyed.drop(columns=['name'])
+
+
+def build_fact_table(data_type: str, data: pd.DataFrame, school_dim: pd.DataFrame):
+    with stage(f'build_fact_table:{data_type}') as record:
+        if data_type == 'tuition_cost':
+            fact = data[cost_cols].assign(school_id=school_dim['school_id'].to_numpy())
+            fact = fact[['school_id'] + cost_cols]
+        else:
+            data = data[source_cols[data_type]]
+            if data_type == 'tuition_income':
+                data = data.assign(income_lvl=data['income_lvl'].replace('48_001 to 75,000', '48,001 to 75,000'))
+
+            fact = attach_school_id(data, school_dim)
+        record['rows'] = len(fact)
+
+    return fact
+
+
+def fact_table_name(data_type: str, partition=None):
+    return f'fact.{data_type}' if partition is None else f'fact.{data_type}.{partition}'
+
+
+@cached('school_dim')
+def _school_dim(version: tuple):
+    school_dim = read_snapshot('school_dim', version)
+    if school_dim is None:
+        school_dim = build_school_dim(load_data('tuition_cost', columns=dim_cols))
+    return share('school_dim', school_dim)
+
+
+@cached('fact_table')
+def _fact_table(data_type: str, version: tuple, partition=None):
+    name = fact_table_name(data_type, partition)
+    fact = read_snapshot(name, version)
+    if fact is None:
+        school_dim = _school_dim(version[:1])
+
+        if partition is None:
+            data = load_data(data_type, columns=source_cols[data_type])
+        else:
+            data = load_partition(data_type, partition, columns=source_cols[data_type])
+
+        fact = build_fact_table(data_type, data, school_dim)
+
+    return share(name, fact)
+
+
+def get_school_dim():
+    return _school_dim(data_version('tuition_cost'))
+
+
+def get_fact_table(data_type: str, partition=None):
+    return _fact_table(data_type, data_version('tuition_cost', data_type), partition)
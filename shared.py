@@ -0,0 +1,82 @@
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+# Tables built once per process and handed to every session are never copied for a
+# session: with Copy-on-Write, column projections and row selections of them are
+# lazy views, and writing to a derived frame copies only that frame.
+pd.set_option('mode.copy_on_write', True)
+
+# Shared tables are frozen, so a write into their numeric or categorical values fails
+# where it happens. Their structure (columns, shape, dtypes) is checked at the end of
+# each page run; with this set every value, object columns included, is hashed and
+# checked as well, at a cost that grows with the number of cached tables.
+CHECK_VALUES = os.environ.get('TUITION_CHECK_SHARED', '0') == '1'
+
+
+class SharedTableMutated(RuntimeError):
+    pass
+
+
+# Weak references only, so tables evicted from the Streamlit caches are still freed.
+_tables = {}
+_lock = threading.Lock()
+
+
+def _hash(df: pd.DataFrame):
+    return int(pd.util.hash_pandas_object(df, index=True).sum())
+
+
+def _fingerprint(df: pd.DataFrame):
+    structure = (tuple(df.columns), df.shape, tuple(str(dtype) for dtype in df.dtypes))
+    if not CHECK_VALUES:
+        return structure
+    return structure + (_hash(df),)
+
+
+def _freeze(df: pd.DataFrame):
+    # Marks the arrays behind every block read-only, so assigning into the table raises
+    # ValueError. Views taken from it (column projections, row slices) share those
+    # arrays and the flag: Copy-on-Write copies them before a write only while the table
+    # is still alive, and once it is evicted and freed the write fails instead. Frames
+    # derived from a shared table therefore only gain columns (assign, new keys) or are
+    # copied explicitly before values are written into them. Object arrays are left
+    # writable: some of pandas' own routines (memory_usage among them) refuse read-only
+    # object buffers. pandas has no public handle on a frame's blocks.
+    for block in df._mgr.blocks:
+        # Categorical and datetime blocks keep their codes or values in _ndarray.
+        values = getattr(block.values, '_ndarray', block.values)
+        if isinstance(values, np.ndarray) and values.dtype != object:
+            values.flags.writeable = False
+
+
+def share(name: str, df: pd.DataFrame):
+    # Registers a table that is about to be returned to every session; callers must
+    # treat it as read-only and derive new frames instead of assigning into it.
+    _freeze(df)
+    key = id(df)
+    ref = weakref.ref(df, lambda _: _forget(key))
+    with _lock:
+        _tables[key] = (name, ref, _fingerprint(df))
+    return df
+
+
+def _forget(key: int):
+    with _lock:
+        _tables.pop(key, None)
+
+
+def check_shared():
+    with _lock:
+        tables = dict(_tables)
+
+    for key, (name, ref, fingerprint) in tables.items():
+        df = ref()
+        if df is not None and _fingerprint(df) != fingerprint:
+            # Reported once, by the run that finds it, rather than by every later run.
+            _forget(key)
+            raise SharedTableMutated(f'shared table {name} was modified in place; derive a new frame instead')
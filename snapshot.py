@@ -0,0 +1,129 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+import data_loader
+import diversity
+from data_loader import data_version, load_data, load_manifest, load_partition
+from diversity import build_dfs, diversity_table_name
+from income_levels import build_df2, build_median_tables, snapshot_median_tables
+from schools import build_fact_table, build_school_dim, fact_table_name, source_cols
+from us_map import build_state_cube
+
+
+DATA_TYPES = ['tuition_cost', 'tuition_income', 'salary_potential', 'historical_tuition', 'diversity_school']
+FACT_TYPES = ['tuition_cost', 'tuition_income', 'salary_potential', 'diversity_school']
+
+
+def write_table(out_dir: Path, name: str, data, version: tuple):
+    # Uncompressed, so readers can map the buffers instead of decoding them. Files are
+    # replaced rather than rewritten in place: processes that still map the old file
+    # keep its inode until they let go of it.
+    file_name = f'{name}.arrow'
+    tmp_path = out_dir / f'.{file_name}.{os.getpid()}.tmp'
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, out_dir / file_name)
+
+    return {'file': file_name, 'version': list(version), 'rows': len(data)}
+
+
+def read_table(out_dir: Path, entry: dict):
+    # A table of a snapshot whatever data version it was built from.
+    return pa.ipc.open_file(pa.memory_map(str(out_dir / entry['file']))).read_all().to_pandas(split_blocks=True)
+
+
+def read_manifest(out_dir: Path):
+    try:
+        with open(out_dir / 'snapshot.json') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def publish(out_dir: Path, tables: dict):
+    # Written last: until it is replaced, readers keep using the previous snapshot.
+    tmp_path = out_dir / f'.snapshot.json.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'created_at': time.time(), 'tables': tables}, f)
+    os.replace(tmp_path, out_dir / 'snapshot.json')
+
+    current = {table['file'] for table in tables.values()} | {'snapshot.json'}
+    for path in out_dir.glob('*.arrow'):
+        if path.name not in current:
+            path.unlink(missing_ok=True)
+
+
+def build_snapshot(out_dir: Path = None):
+    out_dir = Path(out_dir or data_loader.SNAPSHOT_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Always built from the Parquet cache, never from an older snapshot.
+    tables = {}
+    datasets = {}
+    for data_type in DATA_TYPES:
+        datasets[data_type] = load_data(data_type, use_snapshot=False)
+        tables[data_type] = write_table(out_dir, data_type, datasets[data_type], data_version(data_type))
+
+    school_dim = build_school_dim(datasets['tuition_cost'])
+    tables['school_dim'] = write_table(out_dir, 'school_dim', school_dim, data_version('tuition_cost'))
+
+    facts = {}
+    for data_type in FACT_TYPES:
+        version = data_version('tuition_cost', data_type)
+        facts[data_type] = build_fact_table(data_type, datasets[data_type], school_dim)
+        tables[fact_table_name(data_type)] = write_table(out_dir, fact_table_name(data_type), facts[data_type], version)
+
+    for data_type in data_loader.PARTITION_COLS:
+        version = data_version('tuition_cost', data_type)
+        for value in load_manifest(data_type)['partitions']:
+            partition = int(value)
+            fact = build_fact_table(data_type, load_partition(data_type, partition, columns=source_cols[data_type]), school_dim)
+            name = fact_table_name(data_type, partition)
+            tables[name] = write_table(out_dir, name, fact, version)
+
+            if data_type == 'tuition_income':
+                median_tables = build_median_tables(build_df2(school_dim, fact))
+                for table_name, table in snapshot_median_tables(partition, median_tables).items():
+                    tables[table_name] = write_table(out_dir, table_name, table, version)
+
+    # The pages' aggregates, so `--incremental` can update them in place later.
+    cube = build_state_cube(school_dim, facts['tuition_cost'], facts['salary_potential'], facts['diversity_school'])
+    tables['state_cube'] = write_table(out_dir, 'state_cube', cube, data_version('tuition_cost', 'salary_potential', 'diversity_school'))
+
+    for div_type, x_type in itertools.product(diversity.DIV_OPTIONS, diversity.X_COLUMNS.values()):
+        name = diversity_table_name(div_type, x_type)
+        stat_df = build_dfs(school_dim, facts['diversity_school'], div_type, x_type)
+        tables[name] = write_table(out_dir, name, stat_df, data_version('tuition_cost', 'diversity_school'))
+
+    publish(out_dir, tables)
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the datasets and the joined school tables as memory-mappable Arrow IPC files.')
+    parser.add_argument('--out', help=f'Snapshot folder (default: TUITION_SNAPSHOT_DIR or {data_loader.SNAPSHOT_DIR})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Diff the data against the existing snapshot and only rebuild the tables and aggregates it changed')
+    args = parser.parse_args()
+
+    if args.incremental:
+        from incremental import update_snapshot
+        tables, rebuilt = update_snapshot(args.out)
+    else:
+        tables = build_snapshot(args.out)
+        rebuilt = set(tables)
+
+    for name, table in tables.items():
+        print(f"{name:40} {table['rows']:>10} rows  {'rebuilt' if name in rebuilt else 'kept'}")
+
+
+if __name__ == '__main__':
+    main()
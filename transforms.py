@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+
+# Categories that diversity_school does not report directly but that can be derived
+# as total_enrollment minus the enrollment of another category.
+COMPLEMENT_CATEGORIES = {
+    'Men': 'Women'
+}
+
+
+def add_complement_categories(df: pd.DataFrame, complements: dict, category_col: str = 'category',
+                              value_col: str = 'enrollment', total_col: str = 'total_enrollment'):
+    # Build every derived category for every school in one pass and append them to
+    # the long-format table, instead of creating a frame per school.
+    frames = [df]
+    for new_category, source_category in complements.items():
+        source = df[df[category_col] == source_category]
+        frames.append(source.assign(**{
+            category_col: new_category,
+            value_col: source[total_col] - source[value_col]
+        }))
+
+    long_df = pd.concat(frames, ignore_index=True)
+    return long_df
+
+
+def bin_points(df: pd.DataFrame, x_col: str, y_col: str, size_col: str, bins: int, facet_col: str = None, color_col: str = None):
+    # Collapse the points of every facet onto a bins x bins grid, so the number of
+    # markers is bounded by the grid instead of growing with the data. Grid edges
+    # follow each facet's own range since facets do not share axes. The color column
+    # is not part of the grid, or the bound would grow with its number of values:
+    # each cell takes the value most of its points have.
+    facet_keys = [facet_col] if facet_col else []
+    coords = {}
+    for col in [x_col, y_col]:
+        if facet_keys:
+            low = df.groupby(facet_keys, observed=True)[col].transform('min')
+            high = df.groupby(facet_keys, observed=True)[col].transform('max')
+        else:
+            low = pd.Series(df[col].min(), index=df.index)
+            high = pd.Series(df[col].max(), index=df.index)
+        span = (high - low).where(high > low, 1)
+        coords[f'{col}_bin'] = np.floor((df[col] - low) / span * bins).clip(upper=bins - 1)
+
+    keys = facet_keys + list(coords)
+    gridded = df.assign(**coords)
+    binned = gridded.groupby(keys, observed=True).agg(**{
+        x_col: (x_col, 'mean'),
+        y_col: (y_col, 'mean'),
+        size_col: (size_col, 'sum'),
+        'schools': (x_col, 'size')
+    }).reset_index()
+
+    if color_col is not None:
+        counts = gridded.groupby(keys + [color_col], observed=True).size().rename('_points').reset_index()
+        dominant = counts.sort_values('_points', ascending=False, kind='stable').drop_duplicates(keys)
+        binned = binned.merge(dominant[keys + [color_col]], on=keys, how='left')
+        # Legend entries in the order of the column's values.
+        binned = binned.sort_values(facet_keys + [color_col], kind='stable').reset_index(drop=True)
+
+    return binned.drop(columns=list(coords))
@@ -1,81 +1,55 @@
-import streamlit as st
+import itertools
+import os
+
 import pandas as pd
-import numpy as np
-import plotly.express as px
 
+import backend
+from figure_cache import cached_figure
+from instrumentation import instrumented, stage
+from schools import get_fact_table, get_school_dim
+from transforms import bin_points
 
-def load_data(data_type: str):
-    data = pd.read_csv(f'https://raw.githubusercontent.com/rfordatascience/tidytuesday/main/data/2020/2020-03-10/{data_type}.csv')
-    return data
 
-def clean_state_name(tuition_cost: pd.DataFrame):
-    state_dict = {
-        'AS': 'American Samoa',
-        'DC': 'District of Columbia',
-        'PR': 'Puerto Rico',
-        'GU': 'Guam',
-        'VI': 'Virgin Islands'
-    }
+COLOR_OPTIONS = ('State', 'Degree Length', 'Region', 'Regional Division')
+X_OPTIONS = ('Out-of-State', 'In-State')
+Y_OPTIONS = ('Mid-Career', 'Early Career')
 
-    tuition_cost.loc[tuition_cost['state'].isnull(), 'state'] = tuition_cost.loc[tuition_cost['state'].isnull(), 'state_code'].map(state_dict)
-    return tuition_cost
 
-def get_df1(tuition_cost: pd.DataFrame, salary_potential: pd.DataFrame, diversity_school: pd.DataFrame):
-    sub_cost = tuition_cost[['name', 'state', 'type', 'degree_length', 'in_state_tuition', 'out_of_state_tuition']].copy()
-    sub_sal = salary_potential[['rank', 'name', 'early_career_pay', 'mid_career_pay']].copy()
-    sub_div = diversity_school[['name', 'total_enrollment']].copy()
+def widget_combinations():
+    return list(itertools.product(COLOR_OPTIONS, X_OPTIONS, Y_OPTIONS))
 
-    df_sub = pd.merge(sub_cost, sub_sal, how='inner', on='name')
-    df1 = pd.merge(df_sub, sub_div, how='inner', on='name')
+# Above WEBGL_THRESHOLD points the scatter is drawn with WebGL instead of SVG markers;
+# above AGGREGATE_THRESHOLD points are binned on the server to an AGGREGATE_BINS grid
+# per facet, so the figure payload stops growing with the school list.
+WEBGL_THRESHOLD = int(os.environ.get('TUITION_WEBGL_THRESHOLD', 1000))
+AGGREGATE_THRESHOLD = int(os.environ.get('TUITION_AGGREGATE_THRESHOLD', 20000))
+AGGREGATE_BINS = int(os.environ.get('TUITION_AGGREGATE_BINS', 40))
 
-    return df1
 
-def set_regions_divisions(df1: pd.DataFrame):
-    region_dict = {
-        'Northeast': ['New England', 'Middle Atlantic'],
-        'Midwest': ['East North Central', 'West North Central'],
-        'South': ['South Atlantic', 'East South Central', 'West South Central'],
-        'West': ['Mountain', 'Pacific'],
-        'Territories': ['Territories']
-    }
-    division_dict = {
-        'New England': ['Connecticut', 'Maine', 'Massachusetts', 'New Hampshire', 'Rhode Island', 'Vermont'],
-        'Middle Atlantic': ['New Jersey', 'New York', 'Pennsylvania'],
-        'East North Central': ['Illinois', 'Indiana', 'Michigan', 'Ohio', 'Wisconsin'],
-        'West North Central': ['Iowa', 'Kansas', 'Minnesota', 'Missouri', 'Nebraska', 'North Dakota', 'South Dakota'],
-        'South Atlantic': ['Delaware', 'District of Columbia', 'Florida', 'Georgia', 'Maryland', 'North Carolina', 'South Carolina', 'Virginia', 'West Virginia'],
-        'East South Central': ['Alabama', 'Kentucky', 'Mississippi', 'Tennessee'],
-        'West South Central': ['Arkansas', 'Louisiana', 'Oklahoma', 'Texas'],
-        'Mountain': ['Arizona', 'Colorado', 'Idaho', 'Montana', 'Nevada', 'New Mexico', 'Utah', 'Wyoming'],
-        'Pacific': ['Alaska', 'California', 'Hawaii', 'Oregon', 'Washington'],
-        'Territories': ['American Samoa', 'Puerto Rico', 'Guam', 'Virgin Islands']
-    }
+@instrumented('get_df1')
+def get_df1(school_dim: pd.DataFrame, tuition_cost: pd.DataFrame, salary_potential: pd.DataFrame, diversity_school: pd.DataFrame):
+    sub_school = school_dim[['school_id', 'name', 'state', 'type', 'degree_length', 'division', 'region']]
+    sub_cost = tuition_cost[['school_id', 'in_state_tuition', 'out_of_state_tuition']]
+    sub_sal = salary_potential[['school_id', 'rank', 'early_career_pay', 'mid_career_pay']]
+    # diversity_school has one row per category, but total_enrollment is per school.
+    sub_div = diversity_school[['school_id', 'total_enrollment']].drop_duplicates('school_id')
 
-    inv_region_dict = {}
-    for key, lis in region_dict.items():
-        for div in lis:
-            inv_region_dict[div] = key
-
-    inv_division_dict = {}
-    for key, lis in division_dict.items():
-        for state in lis:
-            inv_division_dict[state] = key
-
-    df1['division'] = df1['state'].map(inv_division_dict)
-    df1['region'] = df1['division'].map(inv_region_dict)
+    df_sub = backend.merge(sub_school, sub_cost, how='inner', on='school_id')
+    df_sub = backend.merge(df_sub, sub_sal, how='inner', on='school_id')
+    df1 = backend.merge(df_sub, sub_div, how='inner', on='school_id')
 
     return df1
 
+@cached_figure('tuition_salary', ('tuition_cost', 'salary_potential', 'diversity_school'))
 def produce_plot1(color_col: str, x_col: str, y_col: str):
     data_types = {'tc': 'tuition_cost', 'ti': 'tuition_income', 'sp': 'salary_potential', 'ht': 'historical_tuition', 'ds': 'diversity_school'}
 
-    tuition_cost = load_data(data_types['tc'])
-    tuition_cost = clean_state_name(tuition_cost)
-    salary_potential = load_data(data_types['sp'])
-    diversity_school = load_data(data_types['ds'])
+    school_dim = get_school_dim()
+    tuition_cost = get_fact_table(data_types['tc'])
+    salary_potential = get_fact_table(data_types['sp'])
+    diversity_school = get_fact_table(data_types['ds'])
 
-    df1 = get_df1(tuition_cost, salary_potential, diversity_school)
-    df1 = set_regions_divisions(df1)
+    df1 = get_df1(school_dim, tuition_cost, salary_potential, diversity_school)
 
     x_dict = {
         'In-State': 'in_state_tuition',
@@ -92,33 +66,54 @@ def produce_plot1(color_col: str, x_col: str, y_col: str):
         'Regional Division': 'division'
     }
 
-    fig = px.scatter(
-        df1, x=x_dict[x_col], y=y_dict[y_col], color=color_dict[color_col], size='total_enrollment', facet_col='type',
-        labels={"in_state_tuition": "In-State Tuition", 'out_of_state_tuition': 'Out-of-State Tuition', "mid_career_pay": "Mid Career Salary", 'region': 'Region',
-                'state': 'State', 'total_enrollment': 'Total Enrollment', 'type': 'Type', 'name': 'School', 'early_career_pay': 'Early Career Salary', 'division': 'Regional Division'},
-        hover_name='name'
-    )
-    fig.update_xaxes(matches=None)
-    fig.update_yaxes(matches=None)
-    fig.update_layout(height=600, margin=dict(l=20,r=20,t=40,b=20))
+    hover = {'hover_name': 'name'}
+    if len(df1) > AGGREGATE_THRESHOLD:
+        with stage('bin_points') as record:
+            df1 = bin_points(df1, x_dict[x_col], y_dict[y_col], 'total_enrollment', AGGREGATE_BINS,
+                             facet_col='type', color_col=color_dict[color_col])
+            record['rows'] = len(df1)
+        hover = {'hover_data': {'schools': True}}
+
+    with stage('figure'):
+        # plotly.express is only loaded once a chart is built; it takes longer to
+        # import than most charts take to draw.
+        import plotly.express as px
+
+        fig = px.scatter(
+            df1, x=x_dict[x_col], y=y_dict[y_col], color=color_dict[color_col], size='total_enrollment', facet_col='type',
+            labels={"in_state_tuition": "In-State Tuition", 'out_of_state_tuition': 'Out-of-State Tuition', "mid_career_pay": "Mid Career Salary", 'region': 'Region',
+                    'state': 'State', 'total_enrollment': 'Total Enrollment', 'type': 'Type', 'name': 'School', 'early_career_pay': 'Early Career Salary', 'division': 'Regional Division',
+                    'schools': 'Schools'},
+            render_mode='webgl' if len(df1) > WEBGL_THRESHOLD else 'svg',
+            **hover
+        )
+        fig.update_xaxes(matches=None)
+        fig.update_yaxes(matches=None)
+        fig.update_layout(height=600, margin=dict(l=20,r=20,t=40,b=20))
 
     return fig
 
 
-title = st.header("Tuition Cost & Salaries")
+if __name__ == "__main__":
+    import streamlit as st
+
+    from fragments import chart_fragment
+
+    title = st.header("Tuition Cost & Salaries")
 
-add_color_checkbox = st.sidebar.selectbox(
-    'Color By:', ('State', 'Degree Length', 'Region', 'Regional Division')
-)
+    def controls():
+        add_color_checkbox = st.selectbox(
+            'Color By:', COLOR_OPTIONS
+        )
 
-add_x_checkbox = st.sidebar.selectbox(
-    'Tuition Type:', ('Out-of-State', 'In-State')
-)
+        add_x_checkbox = st.selectbox(
+            'Tuition Type:', X_OPTIONS
+        )
 
-add_y_checkbox = st.sidebar.selectbox(
-    'Salary Type:', ('Mid-Career', 'Early Career')
-)
+        add_y_checkbox = st.selectbox(
+            'Salary Type:', Y_OPTIONS
+        )
 
-fig1 = produce_plot1(add_color_checkbox, add_x_checkbox, add_y_checkbox)
+        return add_color_checkbox, add_x_checkbox, add_y_checkbox
 
-chart1 = st.plotly_chart(fig1, use_container_width=True)
\ No newline at end of file
+    chart_fragment('tuition_salary', controls, produce_plot1)
@@ -1,157 +1,148 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
+import itertools
 import re
 
+import pandas as pd
 
-def load_data(data_type: str):
-    data = pd.read_csv(f'https://raw.githubusercontent.com/rfordatascience/tidytuesday/main/data/2020/2020-03-10/{data_type}.csv')
-    return data
+import backend
+from cache_manager import cached
+from data_loader import data_version, read_snapshot
+from figure_cache import cached_figure
+from instrumentation import instrumented, stage
+from schools import get_fact_table, get_school_dim
+from shared import share
 
 
-def clean_state_name(tuition_cost: pd.DataFrame):
-    state_dict = {
-        'AS': 'American Samoa',
-        'DC': 'District of Columbia',
-        'PR': 'Puerto Rico',
-        'GU': 'Guam',
-        'VI': 'Virgin Islands'
-    }
+TYPE_OPTIONS = ("Public", "Private", "For Profit")
+LENGTH_OPTIONS = ("4 Year", "2 Year")
+DATA_OPTIONS = ("Out-of-State Tuition", "In-State Tuition", "Room & Board", "Early Career Pay", "Mid Career Pay", "Race", "Gender")
 
-    tuition_cost.loc[tuition_cost['state'].isnull(), 'state'] = tuition_cost.loc[tuition_cost['state'].isnull(), 'state_code'].map(state_dict)
-    return tuition_cost
 
+def widget_combinations():
+    # Every subset of each multiselect, empty ones included, in option order; the
+    # order a user picks them in does not change the chart.
+    type_lists = [list(combo) for size in range(len(TYPE_OPTIONS) + 1) for combo in itertools.combinations(TYPE_OPTIONS, size)]
+    length_lists = [list(combo) for size in range(len(LENGTH_OPTIONS) + 1) for combo in itertools.combinations(LENGTH_OPTIONS, size)]
+    return list(itertools.product(type_lists, length_lists, DATA_OPTIONS))
 
-def set_regions_divisions(df: pd.DataFrame):
-    region_dict = {
-        'Northeast': ['New England', 'Middle Atlantic'],
-        'Midwest': ['East North Central', 'West North Central'],
-        'South': ['South Atlantic', 'East South Central', 'West South Central'],
-        'West': ['Mountain', 'Pacific']
+
+@instrumented('build_state_cube')
+def build_state_cube(school_dim: pd.DataFrame, tuition_cost: pd.DataFrame, salary_potential: pd.DataFrame, diversity_school: pd.DataFrame):
+    cost_dict = {
+        "Out-of-State Tuition": "out_of_state_tuition",
+        "In-State Tuition": "in_state_tuition",
+        "Room & Board": "room_and_board"
     }
-    division_dict = {
-        'New England': ['Connecticut', 'Maine', 'Massachusetts', 'New Hampshire', 'Rhode Island', 'Vermont'],
-        'Middle Atlantic': ['New Jersey', 'New York', 'Pennsylvania'],
-        'East North Central': ['Illinois', 'Indiana', 'Michigan', 'Ohio', 'Wisconsin'],
-        'West North Central': ['Iowa', 'Kansas', 'Minnesota', 'Missouri', 'Nebraska', 'North Dakota', 'South Dakota'],
-        'South Atlantic': ['Delaware', 'District of Columbia', 'Florida', 'Georgia', 'Maryland', 'North Carolina', 'South Carolina', 'Virginia', 'West Virginia'],
-        'East South Central': ['Alabama', 'Kentucky', 'Mississippi', 'Tennessee'],
-        'West South Central': ['Arkansas', 'Louisiana', 'Oklahoma', 'Texas'],
-        'Mountain': ['Arizona', 'Colorado', 'Idaho', 'Montana', 'Nevada', 'New Mexico', 'Utah', 'Wyoming'],
-        'Pacific': ['Alaska', 'California', 'Hawaii', 'Oregon', 'Washington']
+    diversity_dict = {
+        "Gender": "Women",
+        "Race": "Total Minority"
     }
 
-    inv_region_dict = {}
-    for key, lis in region_dict.items():
-        for div in lis:
-            inv_region_dict[div] = key
+    school_keys = school_dim[['school_id', 'state_code', 'type', 'degree_length']]
+
+    # One long table of (school keys, metric, value) rows covering every statistic on the page.
+    facts = []
+    for data_choice, choice in cost_dict.items():
+        sub_cost = tuition_cost[['school_id', choice]].rename(columns={choice: 'value'})
+        facts.append(backend.merge(school_keys, sub_cost, how='inner', on='school_id').assign(metric=data_choice))
+
+    for data_choice in ["Early Career Pay", "Mid Career Pay"]:
+        choice = re.sub(r"\s", "_", data_choice.lower())
+        sub_sal = salary_potential[['school_id', choice]].rename(columns={choice: 'value'})
+        facts.append(backend.merge(school_keys, sub_sal, how='inner', on='school_id').assign(metric=data_choice))
+
+    enrollment_percent = (diversity_school['enrollment'] / diversity_school['total_enrollment']) * 100
+    sub_div = diversity_school[['school_id', 'category']].assign(value=enrollment_percent)
+    for data_choice, category in diversity_dict.items():
+        cat_div = sub_div.loc[sub_div['category'] == category, ['school_id', 'value']]
+        facts.append(backend.merge(school_keys, cat_div, how='inner', on='school_id').assign(metric=data_choice))
+
+    fact_df = pd.concat(facts, ignore_index=True)
 
-    inv_division_dict = {}
-    for key, lis in division_dict.items():
-        for state in lis:
-            inv_division_dict[state] = key
+    # Sums and non-null counts add up across cells, so the mean over any combination
+    # of school types and degree lengths can be recovered from the cube alone.
+    cube = backend.group_agg(fact_df, ['metric', 'type', 'degree_length', 'state_code'], {'sum': ('value', 'sum'), 'count': ('value', 'count')})
 
-    df['division'] = df['state'].map(inv_division_dict)
-    df['region'] = df['division'].map(inv_region_dict)
+    return cube
 
-    return df
 
+def update_state_cube(cube: pd.DataFrame, school_dim: pd.DataFrame, tuition_cost: pd.DataFrame, salary_potential: pd.DataFrame,
+                      diversity_school: pd.DataFrame, states: set):
+    # Rebuilds the cells of the given states from the rows of their schools alone; the
+    # fact tables only need to cover those schools. Every other cell is kept as it is.
+    cells = build_state_cube(school_dim[school_dim['state_code'].isin(states)], tuition_cost, salary_potential, diversity_school)
+    cube = pd.concat([cube[~cube['state_code'].isin(states)], cells], ignore_index=True)
 
-def get_df(type_list: np.array, length_list: np.array, data_choice: str):
+    # Back in the order build_state_cube sorts its groups in.
+    return cube.sort_values(['metric', 'type', 'degree_length', 'state_code'], ignore_index=True)
+
+
+@cached('state_cube')
+def get_state_cube(version: tuple):
     data_types = {'tc': 'tuition_cost', 'ti': 'tuition_income', 'sp': 'salary_potential', 'ht': 'historical_tuition', 'ds': 'diversity_school'}
-    tuition_cost = load_data(data_types['tc'])
-    salary_potential = load_data(data_types['sp'])
-    diversity_school = load_data(data_types['ds'])
+    cube = read_snapshot('state_cube', version)
+    if cube is None:
+        school_dim = get_school_dim()
+        tuition_cost = get_fact_table(data_types['tc'])
+        salary_potential = get_fact_table(data_types['sp'])
+        diversity_school = get_fact_table(data_types['ds'])
+        cube = build_state_cube(school_dim, tuition_cost, salary_potential, diversity_school)
 
-    tuition_cost = clean_state_name(tuition_cost)
-    tuition_cost = set_regions_divisions(tuition_cost)
+    return share('state_cube', cube)
 
-    filt_tuition_cost = tuition_cost[(tuition_cost['type'].isin(type_list)) & (tuition_cost['degree_length'].isin(length_list))].reset_index(drop=True)
 
-    if data_choice in ["Early Career Pay", "Mid Career Pay"]:
-        choice = re.sub(r"\s", "_", data_choice.lower())
-        salary_potential = salary_potential[['name', choice]].copy()
-        filt_salary_potential = salary_potential[salary_potential['name'].isin(filt_tuition_cost['name'].unique())].reset_index(drop=True)
-        filt_tuition_cost = filt_tuition_cost[['name', 'state_code']].copy()
-
-        df = pd.merge(filt_tuition_cost, filt_salary_potential, how="inner", on="name")
-        df['avg_choice'] = df.groupby('state_code')[choice].transform('mean')
-        stat_df = df[['state_code', 'avg_choice']].drop_duplicates().reset_index(drop=True)
-
-    elif data_choice in ["Race", "Gender"]:
-        diversity_school = diversity_school.drop(columns=['state'])
-        filt_diversity_school = diversity_school[diversity_school['name'].isin(filt_tuition_cost['name'].unique())].reset_index(drop=True)
-        filt_tuition_cost = filt_tuition_cost[['name', 'state_code']].copy()
-        df = pd.merge(filt_tuition_cost, filt_diversity_school, how='inner', on='name')
-
-        if data_choice == 'Gender':
-            df = df[df['category'] == 'Women'].reset_index(drop=True)
-
-            # men_rows = []
-            # for _, row in df.iterrows():
-            #     men_enrollment = row['total_enrollment'] - row['enrollment']
-            #     temp_df = pd.DataFrame({
-            #         'name': row['name'],
-            #         'total_enrollment': row['total_enrollment'],
-            #         'state': row['state'],
-            #         'category': ['Men'],
-            #         'enrollment': [men_enrollment]
-            #     })
-            #     men_rows.append(temp_df)
-
-            # df = pd.concat([df] + men_rows, ignore_index=True).sort_values(by='name').reset_index(drop=True)
-
-        else:
-            df = df[df['category'] == 'Total Minority'].reset_index(drop=True)
-
-        df['enrollment_percent'] = (df['enrollment'] / df['total_enrollment']) * 100
-        df['avg_choice'] = df.groupby('state_code')['enrollment_percent'].transform('mean')
-        stat_df = df[['state_code', 'avg_choice']].drop_duplicates().reset_index(drop=True)
-
-    else:
-        cost_dict = {
-            "Out-of-State Tuition": "out_of_state_tuition",
-            "In-State Tuition": "in_state_tuition",
-            "Room & Board": "room_and_board"
-        }
-
-        choice = cost_dict[data_choice]
-        df = filt_tuition_cost[['name', 'state_code', choice]].copy()
-        df['avg_choice'] = df.groupby('state_code')[choice].transform('mean')
-        stat_df = df[['state_code', 'avg_choice']].drop_duplicates().reset_index(drop=True)
+@instrumented('get_df')
+def get_df(type_list: list, length_list: list, data_choice: str):
+    cube = get_state_cube(data_version('tuition_cost', 'salary_potential', 'diversity_school'))
+
+    cells = cube[(cube['metric'] == data_choice) & (cube['type'].isin(type_list)) & (cube['degree_length'].isin(length_list))]
+    totals = backend.group_agg(cells, ['state_code'], {'sum': ('sum', 'sum'), 'count': ('count', 'sum')}, sort=False)
+
+    stat_df = pd.DataFrame({
+        'state_code': totals['state_code'],
+        'avg_choice': totals['sum'] / totals['count']
+    })
 
     return stat_df
 
 
-def produce_plot(type_list: np.array, length_list: np.array, data_choice: str):
+@cached_figure('us_map', ('tuition_cost', 'salary_potential', 'diversity_school'))
+def produce_plot(type_list: list, length_list: list, data_choice: str):
     df = get_df(type_list, length_list, data_choice)
 
-    fig = px.choropleth(locations=df['state_code'], locationmode="USA-states", color=df['avg_choice'], scope="usa", labels={"color": data_choice})
-    fig.update_geos(
-        scope="usa",
-        projection=dict(type="albers usa"),
-        showcoastlines=False,
-        showcountries=False
-    )
+    with stage('figure'):
+        import plotly.express as px
+
+        fig = px.choropleth(locations=df['state_code'], locationmode="USA-states", color=df['avg_choice'], scope="usa", labels={"color": data_choice})
+        fig.update_geos(
+            scope="usa",
+            projection=dict(type="albers usa"),
+            showcoastlines=False,
+            showcountries=False
+        )
 
     return fig
 
 
-title = st.header("Statistics by State")
+if __name__ == "__main__":
+    import streamlit as st
+
+    from fragments import chart_fragment
+
+    title = st.header("Statistics by State")
 
-filter_type_multiselect = st.sidebar.multiselect(
-    "Filter School Type:", ("Public", "Private", "For Profit"), default=["Public", "Private", "For Profit"]
-)
+    def controls():
+        filter_type_multiselect = st.multiselect(
+            "Filter School Type:", TYPE_OPTIONS, default=TYPE_OPTIONS
+        )
 
-filter_length_multiselect = st.sidebar.multiselect(
-    "Filter Degree Length:", ("4 Year", "2 Year"), default=["4 Year", "2 Year"]
-)
+        filter_length_multiselect = st.multiselect(
+            "Filter Degree Length:", LENGTH_OPTIONS, default=LENGTH_OPTIONS
+        )
 
-choose_data_selectbox = st.sidebar.selectbox(
-    "Show Statistics About:", ( "Out-of-State Tuition", "In-State Tuition", "Room & Board", "Early Career Pay", "Mid Career Pay", "Race", "Gender")
-)
+        choose_data_selectbox = st.selectbox(
+            "Show Statistics About:", DATA_OPTIONS
+        )
 
-fig = produce_plot(filter_type_multiselect, filter_length_multiselect, choose_data_selectbox)
+        return filter_type_multiselect, filter_length_multiselect, choose_data_selectbox
 
-chart = st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    chart_fragment('us_map', controls, produce_plot)
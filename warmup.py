@@ -0,0 +1,85 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+# Pool size for the startup warm-up; 0 turns the warm-up off.
+WARMUP_WORKERS = int(os.environ.get('TUITION_WARMUP_WORKERS', 4))
+DATA_TYPES = ['tuition_cost', 'tuition_income', 'salary_potential', 'historical_tuition', 'diversity_school']
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_started = False
+
+
+def _run(name: str, func, *args):
+    try:
+        func(*args)
+    except Exception as e:
+        # A failed warm-up step only means the first page view does the work itself.
+        logger.warning('warm-up step %s failed: %r', name, e)
+
+
+def _warm_defaults():
+    # Built through the figure cache, so the first visitor of every page gets a hit.
+    import diversity
+    import tuition_income_level
+    import tuition_salary
+    import us_map
+
+    min_year, _ = tuition_income_level.get_values()
+
+    tuition_salary.produce_plot1(tuition_salary.COLOR_OPTIONS[0], tuition_salary.X_OPTIONS[0], tuition_salary.Y_OPTIONS[0])
+    tuition_income_level.produce_plot2(min_year, tuition_income_level.SPLIT_OPTIONS[0])
+    diversity.produce_plot(diversity.DIV_OPTIONS[0], diversity.X_OPTIONS[0])
+    us_map.produce_plot(list(us_map.TYPE_OPTIONS), list(us_map.LENGTH_OPTIONS), us_map.DATA_OPTIONS[0])
+
+
+def _warm_tables(pool: ThreadPoolExecutor):
+    from data_loader import load_manifest, refresh_data
+
+    # Downloads, CSV parsing and the plotly import are independent of each other.
+    pool.submit(_run, 'import plotly.express', importlib.import_module, 'plotly.express')
+    loads = [pool.submit(_run, f'refresh_data:{data_type}', refresh_data, data_type) for data_type in DATA_TYPES]
+    loads.append(pool.submit(_run, 'load_manifest:tuition_income', load_manifest, 'tuition_income'))
+    wait(loads)
+
+    from schools import get_fact_table, get_school_dim
+
+    # Published through the same cache manager entries the pages read, whose per-key
+    # locks make a page that arrives early wait for the build in progress.
+    _run('school_dim', get_school_dim)
+    facts = [pool.submit(_run, f'fact_table:{data_type}', get_fact_table, data_type)
+             for data_type in ['tuition_cost', 'salary_potential', 'diversity_school']]
+    years = [int(year) for year in load_manifest('tuition_income')['partitions']]
+    facts += [pool.submit(_run, f'fact_table:tuition_income={year}', get_fact_table, 'tuition_income', year) for year in years]
+    wait(facts)
+
+    from income_levels import get_median_tables
+
+    wait([pool.submit(_run, f'median_tables:{year}', get_median_tables, year) for year in years])
+
+
+def _warm(workers: int):
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='warmup') as pool:
+            _run('tables', _warm_tables, pool)
+        _run('default figures', _warm_defaults)
+    finally:
+        logger.info('warm-up finished in %.1fs', time.perf_counter() - start)
+
+
+def start_warmup(workers: int = WARMUP_WORKERS):
+    # streamlit_app.py runs on every rerun of every session; only the first call starts anything.
+    global _started
+    with _lock:
+        if _started or workers <= 0:
+            return
+        _started = True
+
+    threading.Thread(target=_warm, args=(workers,), name='warmup', daemon=True).start()